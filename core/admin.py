@@ -2,13 +2,32 @@ from django.contrib import admin
 
 # Register your models here.
 from .models import Screenshot
+from .search import search_screenshots
 # IMport the html template
 from django.utils.html import format_html
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR, SEARCH_VAR
+
+class SearchChangeList(ChangeList):
+    def get_ordering(self, request, queryset):
+        # Keep the FTS ranking unless a column ordering was chosen
+        if self.params.get(SEARCH_VAR) and ORDER_VAR not in self.params:
+            return ['search_rank', '-timestamp', '-pk']
+        return super().get_ordering(request, queryset)
 
 class ScreenshotAdmin(admin.ModelAdmin):
     list_display = ('title', 'excutable_name', 'screenshot_type','is_nsfw', 'is_profane', 'timestamp')
     search_fields = ('title', 'excutable_name')
     list_filter = ('screenshot_type', 'is_nsfw', 'is_profane', 'timestamp')
+    ordering = ('-timestamp',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search the title and executable name with the FTS index"""
+        if not search_term:
+            return queryset, False
+        return search_screenshots(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return SearchChangeList
     
     # Show the image in the admin from the base64 string
     readonly_fields = ('image',)
@@ -0,0 +1,204 @@
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import transaction
+
+from openchaver.dirs import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+ANALYSES = ("profanity", "nsfw")
+
+# Per process state of the pool workers
+_models = {}
+
+
+def init_worker():
+    """Set up Django in a pool process - needed when processes are spawned"""
+    django.setup()
+
+
+def analyze(analysis: str, rows: list) -> list:
+    """Run an analysis on a batch of rows in a pool process.
+
+    Returns the (pk, fields) of every row. Nothing is written here - the
+    parent process owns the database writes.
+    """
+    from .models import Screenshot
+    from .nudity import Classifier, Detector
+    from .profanity import is_profane
+
+    results = []
+    if analysis == "profanity":
+        for pk, title in rows:
+            results.append((pk, {"is_profane": is_profane(title)}))
+        return results
+
+    # Load the models once per process
+    if not _models:
+        _models["classifier"] = Classifier()
+        _models["detector"] = Detector()
+    for pk, base64_image in rows:
+        try:
+            is_nsfw, detection = Screenshot(base64_image=base64_image).detect_nsfw(
+                _models["classifier"], _models["detector"]
+            )
+        except:  # noqa: E722
+            logger.exception(f"NSFW detection failed for {pk}")
+            continue
+        # The detection of a previous run is cleared when the row is not NSFW
+        results.append((pk, {"is_nsfw": is_nsfw, "nsfw_detection": detection if is_nsfw else []}))
+    return results
+
+
+class Checkpoint:
+    """Progress of a backfill, kept in a JSON file so it can resume"""
+
+    def __init__(self, analysis: str) -> None:
+        self.path = get_data_dir("backfill") / f"{analysis}.json"
+        self.last_pk = 0
+        self.rows = 0
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.last_pk = data["last_pk"]
+            self.rows = data["rows"]
+
+    def save(self, last_pk: int, rows: int) -> None:
+        self.last_pk = last_pk
+        self.rows += rows
+        # Write atomically - a crash must not leave a broken checkpoint
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"last_pk": self.last_pk, "rows": self.rows}))
+        os.replace(tmp, self.path)
+
+    def reset(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.last_pk = 0
+        self.rows = 0
+
+
+def backfill_queryset(analysis: str, last_pk: int = 0):
+    """Stream the (pk, input) of the rows to analyze in pk order"""
+    from .models import Screenshot
+
+    queryset = Screenshot.objects.filter(pk__gt=last_pk).order_by("pk")
+    if analysis == "profanity":
+        return queryset.values_list("pk", "title")
+    return queryset.filter(base64_image__isnull=False).values_list(
+        "pk", "base64_image"
+    )
+
+
+def write_results(results: list) -> int:
+    """Write a batch back with one bulk_update - no post_save is sent"""
+    from .models import Screenshot
+
+    objs = {}  # Updated fields -> rows
+    for pk, values in results:
+        obj = Screenshot(pk=pk)
+        for field, value in values.items():
+            setattr(obj, field, value)
+        objs.setdefault(tuple(values), []).append(obj)
+
+    with transaction.atomic():
+        for fields, batch in objs.items():
+            Screenshot.objects.bulk_update(batch, fields)
+        if results and "is_nsfw" in results[0][1]:
+            apply_nsfw_results(results)
+    return len(results)
+
+
+def apply_nsfw_results(results: list) -> None:
+    """Apply the NSFW verdicts like Screenshot.run_nsfw_detection does.
+
+    The unchanged frames take the verdict of their frame. The NSFW captures
+    that are not NSFW are deleted and the NSFW_META ones lose their image.
+    """
+    from .models import Screenshot
+
+    values = dict(results)
+    frames = Screenshot.objects.filter(pk__in=values, frame_id__isnull=False)
+    safe_frames = []
+    for pk, frame_id in frames.values_list("pk", "frame_id"):
+        if values[pk]["is_nsfw"]:
+            Screenshot.objects.filter(unchanged_since=frame_id).update(**values[pk])
+        else:
+            safe_frames.append(frame_id)
+    unchanged = Screenshot.objects.filter(unchanged_since__in=safe_frames)
+    unchanged.filter(screenshot_type="NSFW").delete()
+    unchanged.update(is_nsfw=False, nsfw_detection=[])
+
+    safe = Screenshot.objects.filter(pk__in=[pk for pk, v in results if not v["is_nsfw"]])
+    safe.filter(screenshot_type="NSFW").delete()
+    safe.filter(screenshot_type="NSFW_META").update(base64_image=None)
+
+
+def run_backfill(
+    analysis: str,
+    workers: int | None = None,
+    chunk_size: int = 500,
+    batch_size: int = 100,
+    restart: bool = False,
+    progress=None,
+) -> dict:
+    """Re-run an analysis over the existing screenshots.
+
+    The rows are streamed with iterator(chunk_size) so only a few chunks are
+    in memory, analyzed in batches by a process pool and written back in pk
+    order. The checkpoint is saved after every write, so an interrupted run
+    resumes after the last written batch. A run that completes removes it -
+    the next run starts over, e.g. after the thresholds or models change.
+    """
+    if analysis not in ANALYSES:
+        raise ValueError(f"Unknown analysis: {analysis}")
+
+    workers = workers or os.cpu_count() or 1
+    checkpoint = Checkpoint(analysis)
+    if restart:
+        checkpoint.reset()
+    if checkpoint.last_pk:
+        logger.info(f"Resuming the {analysis} backfill after pk {checkpoint.last_pk}")
+
+    # SQLite gives no isolation between the statements of a connection, but
+    # the writes only touch rows the iterator has already passed
+    rows = backfill_queryset(analysis, checkpoint.last_pk).iterator(
+        chunk_size=chunk_size
+    )
+    written = 0
+    start = time.perf_counter()
+
+    def write(future, last_pk: int) -> None:
+        nonlocal written
+        written += write_results(future.result())
+        checkpoint.save(last_pk, len(future.result()))
+        if progress:
+            progress(written, written / (time.perf_counter() - start))
+
+    with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+        # Bounded number of batches in flight - the table is never loaded at once
+        pending = deque()
+        while batch := list(itertools.islice(rows, batch_size)):
+            pending.append((pool.submit(analyze, analysis, batch), batch[-1][0]))
+            if len(pending) >= workers * 2:
+                write(*pending.popleft())
+        while pending:
+            write(*pending.popleft())
+
+    duration = time.perf_counter() - start
+    report = {
+        "analysis": analysis,
+        "rows": written,
+        "total_rows": checkpoint.rows,
+        "last_pk": checkpoint.last_pk,
+        "duration": round(duration, 3),
+        "rows/s": round(written / duration, 1) if duration else 0.0,
+    }
+    # Every row was written - only an interrupted run resumes
+    checkpoint.reset()
+    return report
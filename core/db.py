@@ -0,0 +1,25 @@
+import logging
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+import django.dispatch
+
+logger = logging.getLogger(__name__)
+
+
+def apply_pragmas(cursor, pragmas: dict) -> None:
+    """Apply the pragmas to a SQLite DB-API cursor"""
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@django.dispatch.receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Tune every new SQLite connection with settings.SQLITE_PRAGMAS"""
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+    logger.debug(f"SQLite connection configured: {pragmas}")
@@ -1,8 +1,12 @@
-import logging
+# cv2 and numpy are imported on first use - importing this module is cheap
+from __future__ import annotations
 
-import cv2 as cv
+import logging
 import base64
-import numpy as np
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +15,7 @@ def encode_numpy_to_base64(img: np.ndarray) -> str:
     """
     Encode a numpy array to base64.
     """
+    import cv2 as cv
 
     return base64.b64encode(cv.imencode(".png", img)[1]).decode()
 
@@ -19,12 +24,26 @@ def decode_base64_to_numpy(str: str) -> np.ndarray:
     """
     Decode a base64 string to a numpy array.
     """
+    import cv2 as cv
+    import numpy as np
 
     return cv.imdecode(np.frombuffer(base64.b64decode(str), np.uint8), -1)
 
 
+def create_thumbnail(img: np.ndarray, max_side: int = 256) -> np.ndarray:
+    """
+    Downscale an image so its largest side is at most max_side.
+    """
+    import cv2 as cv
+    scale = max_side / max(img.shape[0], img.shape[1])
+    if scale >= 1:
+        return img
+    return cv.resize(img, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+
+
 def color_in_image(img: np.ndarray) -> bool:
     """Check if the image has color"""
+    import numpy as np
     return (
         np.count_nonzero(img[:, :, 0] - img[:, :, 1]) > 0
         or np.count_nonzero(img[:, :, 1] - img[:, :, 2]) > 0
@@ -33,6 +52,7 @@ def color_in_image(img: np.ndarray) -> bool:
 
 def deblot_image(mask: np.ndarray, min_size: float):
     """Remove small blobs from an image."""
+    import numpy as np
     import cv2 as cv
 
     (
@@ -56,6 +76,7 @@ def deblot_image(mask: np.ndarray, min_size: float):
 
 def count_skin_pixels(image: np.ndarray):
     """Count the number of pixels in the image which are skin colored"""
+    import numpy as np
     import cv2 as cv
 
     lower = np.array([0, 48, 80], dtype="uint8")
@@ -69,6 +90,17 @@ def count_skin_pixels(image: np.ndarray):
     return np.sum(skin_mask)
 
 
+def raw_skin_ratio(img: np.ndarray) -> float:
+    """Skin ratio on the scale of contains_skin, before the noise removal of
+    count_skin_pixels - an upper bound of it, cheap on a thumbnail"""
+    import cv2 as cv
+    import numpy as np
+    lower = np.array([0, 48, 80], dtype="uint8")
+    upper = np.array([20, 255, 255], dtype="uint8")
+    skin_mask = cv.inRange(cv.cvtColor(img, cv.COLOR_BGR2HSV), lower, upper)
+    return cv.countNonZero(skin_mask) * 255 / (img.shape[0] * img.shape[1])
+
+
 def contains_skin(img: np.ndarray, thresh=1.5) -> bool:
     """Check if the image contains skin beyond a certain threshold"""
     logger.debug("checking if image contains skin")
@@ -86,6 +118,8 @@ def contains_skin(img: np.ndarray, thresh=1.5) -> bool:
 
 
 def get_bounding_boxes(image: np.ndarray) -> list:
+    import cv2 as cv
+    import numpy as np
     # Check if there are skin pixels in the image
     # This is done to remove images that are definitely not NSFW
     if not contains_skin(image, thresh=0.5):
@@ -153,6 +187,7 @@ def match_size(images: list[np.ndarray]) -> list[np.ndarray]:
     Resize images to the size of the largest
     image by adding black borders
     """
+    import cv2 as cv
     max_width = max([img.shape[1] for img in images])
     max_height = max([img.shape[0] for img in images])
     resized_images = []
@@ -0,0 +1,139 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Screenshot
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueue:
+    """Bounded in-process queue of screenshots waiting to be written.
+
+    The ingest view only validates and enqueues, the worker threads write the
+    rows - which runs the post_save analysis - so a slow disk or a slow
+    NSFW detection never holds up the monitor's request.
+    """
+
+    def __init__(self, maxsize: int, workers: int = 1) -> None:
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.threads = []
+        self.lock = threading.Lock()
+        self.accepting = True
+        self.stopping = threading.Event()
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the worker threads if they are not running"""
+        with self.lock:
+            self.threads = [t for t in self.threads if t.is_alive()]
+            for _ in range(self.workers - len(self.threads)):
+                thread = threading.Thread(target=self.worker, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def run(self) -> None:
+        """Run the workers until stop(), then write what is queued.
+
+        The ingest service of runservice - the screenshots queued were
+        acknowledged with a 202 and the monitor no longer has them.
+        """
+        self.accepting = True
+        self.start()
+        self.stopping.wait()
+        logger.info(f"Writing the {self.queue.qsize()} queued screenshots")
+        self.queue.join()
+
+    def stop(self) -> None:
+        """Reject new screenshots and make run() return once the queue is written"""
+        self.accepting = False
+        self.stopping.set()
+
+    def put(self, ingest_id: str, data: dict) -> bool:
+        """Enqueue a screenshot. Returns False if the queue is full or stopping"""
+        self.start()
+        try:
+            with self.lock:
+                if not self.accepting:
+                    logger.warning(f"Stopping - rejecting {ingest_id}")
+                    self.rejected += 1
+                    return False
+                self.queue.put_nowait((ingest_id, data))
+                self.accepted += 1
+            return True
+        except queue.Full:
+            logger.warning(f"Ingest queue is full - rejecting {ingest_id}")
+            with self.lock:
+                self.rejected += 1
+            return False
+
+    def put_many(self, items: list) -> bool:
+        """Enqueue a batch of (ingest_id, data) whole or not at all.
+
+        Returns False if the queue can not hold the whole batch or is
+        stopping.
+        """
+        self.start()
+        # Only put/put_many add to the queue and they hold the lock, so the
+        # free space can only grow between the check and the puts
+        with self.lock:
+            if not self.accepting:
+                logger.warning(f"Stopping - rejecting a batch of {len(items)}")
+                self.rejected += len(items)
+                return False
+            if self.queue.maxsize - self.queue.qsize() < len(items):
+                logger.warning(f"Ingest queue is full - rejecting a batch of {len(items)}")
+                self.rejected += len(items)
+                return False
+            for item in items:
+                self.queue.put_nowait(item)
+            self.accepted += len(items)
+        return True
+
+    def stats(self) -> dict:
+        """Screenshots waiting to be written (the analysis backlog) and counters"""
+        return {
+            "queued": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+    def worker(self) -> None:
+        while True:
+            ingest_id, data = self.queue.get()
+            timestamp = data.pop("timestamp", None)
+            screenshot = Screenshot(**data)
+            try:
+                close_old_connections()
+                try:
+                    screenshot.save()
+                finally:
+                    if timestamp and screenshot.pk:
+                        # Spooled by the monitor - keep the capture time.
+                        # timestamp is auto_now_add, so it is set after the
+                        # insert, even if the post_save analysis failed
+                        Screenshot.objects.filter(pk=screenshot.pk).update(
+                            timestamp=timestamp
+                        )
+                self.written += 1
+                logger.debug(f"Ingested {ingest_id}")
+            except:  # noqa: E722
+                self.failed += 1
+                logger.exception(f"Failed to ingest {ingest_id}")
+            finally:
+                self.queue.task_done()
+
+ingest_queue = IngestQueue(
+    maxsize=settings.INGEST["QUEUE_SIZE"],
+    workers=settings.INGEST["WORKERS"],
+)
@@ -0,0 +1,188 @@
+import base64
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from .benchmarks import percentile
+from .samples import SAMPLE_SUBJECTS, SAMPLE_WINDOWS, sample_screenshot
+
+logger = logging.getLogger(__name__)
+
+# Share of the events of every type - a monitor sends META every second and
+# an image every few minutes
+DEFAULT_MIX = {
+    "META": 0.80,
+    "NSFW_META": 0.10,
+    "NSFW": 0.05,
+    "IMAGE": 0.03,
+    "NSFW_IMAGE": 0.02,
+}
+
+IMAGE_TYPES = ("IMAGE", "NSFW", "NSFW_IMAGE", "NSFW_META")
+
+
+def parse_mix(mix: str) -> dict:
+    """"META=0.8,IMAGE=0.2" -> {"META": 0.8, "IMAGE": 0.2}"""
+    result = {}
+    for part in mix.split(","):
+        screenshot_type, share = part.split("=")
+        result[screenshot_type.strip().upper()] = float(share)
+    return result
+
+
+def load_corpus(path=None, count: int = 8) -> list:
+    """Base64 images of a directory (png/jpg), or synthetic window images"""
+    if not path:
+        return [sample_screenshot(seed=seed) for seed in range(count)]
+
+    images = []
+    for file in sorted(Path(path).iterdir()):
+        if file.suffix.lower() in (".png", ".jpg", ".jpeg"):
+            images.append(base64.b64encode(file.read_bytes()).decode())
+    if not images:
+        raise ValueError(f"No png/jpg images in {path}")
+    return images
+
+
+class LoadReport:
+    """Latencies and outcomes of the requests, per second of the run"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.seconds = {}  # second -> [requests, errors, latencies]
+        self.backlog = {}  # second -> ingest stats of the server
+
+    def record(self, second: int, latency: float | None) -> None:
+        with self.lock:
+            bucket = self.seconds.setdefault(second, [0, 0, []])
+            bucket[0] += 1
+            if latency is None:
+                self.errors += 1
+                bucket[1] += 1
+            else:
+                self.latencies.append(latency)
+                bucket[2].append(latency)
+
+    def timeline(self) -> list:
+        rows = []
+        for second in sorted(self.seconds):
+            count, errors, latencies = self.seconds[second]
+            backlog = self.backlog.get(second, {})
+            rows.append({
+                "second": second,
+                "requests": count,
+                "errors": errors,
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "backlog": backlog.get("queued"),
+            })
+        return rows
+
+    def summary(self, duration: float) -> dict:
+        total = len(self.latencies) + self.errors
+        return {
+            "requests": total,
+            "requests/s": round(total / duration, 1),
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 1),
+            "max_backlog": max((b.get("queued", 0) for b in self.backlog.values()), default=0),
+        }
+
+
+def simulate_monitor(
+    n: int,
+    url: str,
+    rate: float,
+    mix: dict,
+    images: list,
+    start: float,
+    duration: float,
+    report: LoadReport,
+) -> None:
+    """One monitor posting events at `rate` per second (Poisson arrivals).
+
+    Latency is measured from the scheduled send time, so a slow server is
+    not hidden by the client waiting for it (coordinated omission).
+    """
+    rng = random.Random(n)
+    session = requests.Session()
+    types, weights = zip(*mix.items())
+    template, exec_name = rng.choice(SAMPLE_WINDOWS)
+    scheduled = start + rng.expovariate(rate)
+
+    while scheduled < start + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        screenshot_type = rng.choices(types, weights)[0]
+        if rng.random() < 0.1:  # Switch windows now and then
+            template, exec_name = rng.choice(SAMPLE_WINDOWS)
+        data = {
+            "title": template.format(rng.choice(SAMPLE_SUBJECTS)),
+            "excutable_name": exec_name,
+            "screenshot_type": screenshot_type,
+            "base64_image": rng.choice(images) if screenshot_type in IMAGE_TYPES else None,
+        }
+        try:
+            session.post(url, json=data, timeout=30).raise_for_status()
+            latency = time.perf_counter() - scheduled
+        except requests.RequestException:
+            latency = None
+        report.record(int(scheduled - start), latency)
+        scheduled += rng.expovariate(rate)
+
+
+def sample_backlog(stats_url: str, start: float, stop: threading.Event, report: LoadReport) -> None:
+    """Poll the ingest queue depth of the server every second"""
+    session = requests.Session()
+    while not stop.wait(1):
+        try:
+            stats = session.get(stats_url, timeout=5).json()["ingest"]
+        except (requests.RequestException, KeyError, ValueError):
+            continue
+        report.backlog[int(time.perf_counter() - start)] = stats
+
+
+def run_load(
+    base_url: str,
+    monitors: int = 10,
+    rate: float = 1.0,
+    duration: float = 30.0,
+    mix: dict | None = None,
+    images: list | None = None,
+    path: str = "ingest/",
+) -> LoadReport:
+    """Simulate `monitors` monitors against a running API"""
+    report = LoadReport()
+    mix = mix or DEFAULT_MIX
+    images = images or load_corpus()
+    start = time.perf_counter()
+    stop = threading.Event()
+
+    sampler = threading.Thread(
+        target=sample_backlog, args=(base_url + "stats/", start, stop, report), daemon=True
+    )
+    sampler.start()
+    threads = [
+        threading.Thread(
+            target=simulate_monitor,
+            args=(n, base_url + path, rate, mix, images, start, duration, report),
+            daemon=True,
+        )
+        for n in range(monitors)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    sampler.join()
+    return report
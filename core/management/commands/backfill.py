@@ -0,0 +1,41 @@
+import json
+import logging
+from django.core.management.base import BaseCommand
+from core.backfill import ANALYSES, run_backfill
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Re-run the profanity or NSFW analysis over the existing screenshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument("analysis", choices=ANALYSES)
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Processes (default: CPU count)"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=500, help="Rows fetched per query"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="Rows per worker task and bulk_update"
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore the checkpoint and start over"
+        )
+
+    def handle(self, *args, **options):
+        def progress(rows: int, rate: float) -> None:
+            self.stdout.write(f"\r{rows} rows ({rate:.1f} rows/s)", ending="")
+            self.stdout.flush()
+
+        report = run_backfill(
+            options["analysis"],
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+            batch_size=options["batch_size"],
+            restart=options["restart"],
+            progress=progress,
+        )
+        self.stdout.write("")
+        self.stdout.write(json.dumps(report, indent=2))
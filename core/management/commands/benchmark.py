@@ -0,0 +1,47 @@
+import inspect
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules
+
+from core.benchmarks import BENCHMARKS
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run a benchmark and print the results"
+
+    def add_arguments(self, parser):
+        # The benchmarks modules of the apps register their benchmarks
+        autodiscover_modules("benchmarks")
+        parser.add_argument("name", choices=sorted(BENCHMARKS.keys()))
+        parser.add_argument(
+            "-p",
+            "--param",
+            action="append",
+            default=[],
+            metavar="KEY=VALUE",
+            help="Benchmark parameter, can be repeated",
+        )
+
+    def handle(self, *args, **options):
+        params = {}
+        for param in options["param"]:
+            if "=" not in param:
+                raise CommandError(f"Invalid parameter {param}, expected KEY=VALUE")
+            key, value = param.split("=", 1)
+            params[key] = value
+
+        func = BENCHMARKS[options["name"]]
+        accepted = inspect.signature(func).parameters
+        unknown = sorted(set(params) - set(accepted))
+        if unknown:
+            raise CommandError(
+                f"Unknown parameter {', '.join(unknown)} for {options['name']}, "
+                f"expected one of {', '.join(accepted)}"
+            )
+
+        results = func(**params)
+        self.stdout.write(json.dumps(results, indent=2))
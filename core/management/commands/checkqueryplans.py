@@ -0,0 +1,24 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.queryplans import hot_queries, is_full_scan
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Check that the hot Screenshot queries use an index (EXPLAIN QUERY PLAN)"
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, queryset in hot_queries().items():
+            plan = queryset.explain()
+            self.stdout.write(f"{name}:\n{plan}\n")
+            if is_full_scan(plan):
+                failed.append(name)
+
+        if failed:
+            raise CommandError(f"Queries not served by an index: {', '.join(failed)}")
+
+        self.stdout.write(self.style.SUCCESS("All queries use an index"))
@@ -0,0 +1,85 @@
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import free_port, start_api
+from core.loadtest import DEFAULT_MIX, load_corpus, parse_mix, run_load
+from openchaver.server import BACKENDS
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Simulate many monitors against the API and report latency and backlog"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--monitors", type=int, default=10, help="Simulated monitors")
+        parser.add_argument(
+            "--rate", type=float, default=1.0, help="Events per second of every monitor"
+        )
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+            help="Share of every screenshot type, e.g. META=0.8,NSFW=0.2",
+        )
+        parser.add_argument(
+            "--corpus", default=None, help="Directory of png/jpg images (default: synthetic)"
+        )
+        parser.add_argument("--backend", choices=BACKENDS, default="waitress")
+        parser.add_argument("--threads", type=int, default=None, help="Server threads")
+        parser.add_argument(
+            "--path", default="ingest/", help="Endpoint under /api/ to post to"
+        )
+        parser.add_argument(
+            "--url",
+            default=None,
+            help="API of a running server (e.g. http://127.0.0.1:61313/api/) "
+            "instead of starting one on a scratch database",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+            images = load_corpus(options["corpus"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            process = None
+            url = options["url"]
+            if not url:
+                port = free_port()
+                self.stdout.write(f"Starting {options['backend']} on port {port}")
+                process = start_api(
+                    options["backend"], Path(tmp) / "loadtest.sqlite3", port, options["threads"]
+                )
+                url = f"http://127.0.0.1:{port}/api/"
+
+            try:
+                start = time.perf_counter()
+                report = run_load(
+                    url,
+                    monitors=options["monitors"],
+                    rate=options["rate"],
+                    duration=options["duration"],
+                    mix=mix,
+                    images=images,
+                    path=options["path"],
+                )
+                duration = time.perf_counter() - start
+            finally:
+                if process:
+                    process.terminate()
+                    process.wait()
+
+        for row in report.timeline():
+            self.stdout.write(
+                f"{row['second']:>4}s  {row['requests']:>5} req  {row['errors']:>4} err  "
+                f"p95 {row['p95_ms']:>8.1f}ms  backlog {row['backlog']}"
+            )
+        self.stdout.write(json.dumps(report.summary(duration), indent=2))
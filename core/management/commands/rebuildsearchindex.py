@@ -0,0 +1,17 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from core.search import rebuild_search_index
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Build the full-text search index for the existing screenshots"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = rebuild_search_index()
+        self.stdout.write(
+            f"Indexed {rows} screenshots in {time.perf_counter() - start:.2f}s"
+        )
@@ -0,0 +1,22 @@
+import logging
+from django.core.management.base import BaseCommand
+from openchaver.server import run_server, BACKENDS
+from openchaver.const import PORT
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run only the API server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=PORT)
+        parser.add_argument("--backend", choices=BACKENDS, default=None)
+        parser.add_argument("--threads", type=int, default=None)
+
+    def handle(self, *args, **options):
+        run_server(
+            port=options["port"],
+            backend=options["backend"],
+            threads=options["threads"],
+        )
@@ -0,0 +1,22 @@
+import json
+import logging
+from django.core.management.base import BaseCommand
+from core.retention import run_retention
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Apply the retention policies once and vacuum the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental-vacuum",
+            action="store_true",
+            help="Switch the database to incremental vacuum first. Runs a full "
+            "VACUUM once, which locks the database - stop the service before.",
+        )
+
+    def handle(self, *args, **options):
+        report = run_retention(enable_incremental_vacuum=options["incremental_vacuum"])
+        self.stdout.write(json.dumps(report, indent=2))
@@ -1,9 +1,13 @@
 import logging
+import os
 from django.core.management.base import BaseCommand
-from django.core.management import call_command
-from core.watchdog import keep_monitor_alive, keep_watcher_alive
-from openchaver.utils import thread_runner
-from openchaver.const import PORT
+from core.ingest import ingest_queue
+from core.watchdog import keep_watcher_alive
+from core.profanity import watch_word_list
+from core.retention import keep_retention_running
+from openchaver.supervisor import Supervisor
+from openchaver.server import run_server
+from openchaver.const import init_service_logs
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +17,24 @@ class Command(BaseCommand):
     help = "Run the main service"
 
     def handle(self, *args, **options):
+        init_service_logs()
+
         # Start the server on a separate thread
         services = {
             # Server
             "Server": {
-                "target": call_command,
-                "args": ('runserver',str(PORT),'--noreload'),
+                "target": run_server,
+                "args": (),
                 "kwargs": {},
                 "daemon": True,
             },
-            # Keep keep_monitor_alive alive
-            "keep_monitor_alive": {
-                "target": keep_monitor_alive,
+            # Writes the ingested screenshots, the queue is written on shutdown
+            "ingest": {
+                "target": ingest_queue.run,
                 "args": (),
                 "kwargs": {},
                 "daemon": True,
+                "stop": ingest_queue.stop,
             },
             # Keep keep_watcher_alive alive
             "keep_watcher_alive": {
@@ -36,9 +43,34 @@ class Command(BaseCommand):
                 "kwargs": {},
                 "daemon": True,
             },
+            # Retention and compaction of the database
+            "retention": {
+                "target": keep_retention_running,
+                "args": (),
+                "kwargs": {},
+                "daemon": True,
+            },
+
+            # Hot reload of the profanity word list
+            "word_list": {
+                "target": watch_word_list,
+                "args": (),
+                "kwargs": {},
+                "daemon": True,
+            },
 
         }
-        thread_runner(services)
+        if os.name == "nt":
+            from core.watchdog import keep_monitor_alive
+
+            # Start the monitor in every user session
+            services["keep_monitor_alive"] = {
+                "target": keep_monitor_alive,
+                "args": (),
+                "kwargs": {},
+                "daemon": True,
+            }
+        Supervisor(services).run()
 
 
         
\ No newline at end of file
@@ -1,6 +1,8 @@
 import logging
 from django.core.management.base import BaseCommand
 from core.watchdog import keep_service_alive
+from openchaver.supervisor import Supervisor
+from openchaver.const import init_service_logs
 
 logger = logging.getLogger(__name__)
 
@@ -10,8 +12,18 @@ class Command(BaseCommand):
     help = "Keep the service alive"
 
     def handle(self, *args, **options):
-        
-        keep_service_alive()
+        init_service_logs()
+
+        services = {
+            # Keep the service alive
+            "keep_service_alive": {
+                "target": keep_service_alive,
+                "args": (),
+                "kwargs": {},
+                "daemon": True,
+            },
+        }
+        Supervisor(services).run()
 
 
         
\ No newline at end of file
@@ -0,0 +1,118 @@
+import logging
+from collections import deque, namedtuple
+
+from .normalize import normalize, variants
+
+logger = logging.getLogger(__name__)
+
+Match = namedtuple("Match", ["term", "start", "end"])
+
+
+class WordMatcher:
+    """Aho-Corasick automaton over a word list.
+
+    Built once, then every search is a single pass over the text no matter
+    how many words there are. The terms and the text are normalized the
+    same way (see core/normalize.py), so a term matches its leetspeak,
+    spaced, accented and repeated letter spellings. A term only matches
+    whole words.
+    """
+
+    def __init__(self, words: list[str]) -> None:
+        self.terms = []
+        self.counts = []  # Minimum run length of every letter of a term
+        self.lengths = []
+        self.goto = [{}]  # state -> {char: state}
+        self.fail = [0]
+        self.output = [()]  # state -> indexes of the terms ending there
+
+        for word in words:
+            term = word.strip()
+            if term:
+                self.add(term)
+        self.build()
+
+    def add(self, term: str) -> None:
+        normalized = normalize(term)
+        if not normalized.chars:
+            logger.warning(f"Ignoring the term {term!r} - nothing left to match")
+            return
+
+        state = 0
+        for c in normalized.chars:
+            if c not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.goto[state][c] = len(self.goto) - 1
+            state = self.goto[state][c]
+        self.output[state] += (len(self.terms),)
+        self.terms.append(term)
+        self.counts.append(normalized.counts)
+        self.lengths.append(len(normalized.chars))
+
+    def build(self) -> None:
+        """Compute the failure links breadth first"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, child in self.goto[state].items():
+                queue.append(child)
+                fail = self.fail[state]
+                while fail and c not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(c, 0)
+                # Inherit the terms that end at the failure state
+                self.output[child] += self.output[self.fail[child]]
+
+    def scan(self, normalized):
+        """Yield the (term index, start, end) of the terms in a normalized text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        chars, counts = normalized.chars, normalized.counts
+        state = 0
+        for i, c in enumerate(chars):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for t in output[state]:
+                end = i + 1
+                start = end - self.lengths[t]
+                # Whole words only
+                if start > 0 and chars[start - 1] != " ":
+                    continue
+                if end < len(chars) and chars[end] != " ":
+                    continue
+                # Repeated letters must match exactly unless they are
+                # stretched ("fuuuck"), so "cook" is not "cok" and "as" is not "ass"
+                if any(
+                    n != m and (n < 3 or n < m)
+                    for n, m in zip(counts[start:end], self.counts[t])
+                ):
+                    continue
+                yield t, start, end
+
+    def finditer(self, s: str):
+        """Yield the Match of every term in s with its offsets in s"""
+        seen = set()
+        for text in variants(s):
+            readings = [normalize(text)]
+            if readings[0].joined:
+                # "x-va-j-j-y" - the single letters may belong to a term
+                readings.append(normalize(text, join=False))
+            for normalized in readings:
+                for t, start, end in self.scan(normalized):
+                    spans = normalized.spans
+                    match = Match(self.terms[t], spans[start][0], spans[end - 1][1])
+                    if match not in seen:
+                        seen.add(match)
+                        yield match
+
+    def findall(self, s: str) -> list[Match]:
+        return list(self.finditer(s))
+
+    def search(self, s: str) -> Match | None:
+        """The first match in s or None"""
+        return next(self.finditer(s), None)
+
+    def __len__(self) -> int:
+        return len(self.terms)
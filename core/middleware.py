@@ -0,0 +1,79 @@
+import asyncio
+import gzip
+import logging
+import zlib
+from io import BytesIO
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+
+def decompress(data: bytes, encoding: str, limit: int | None) -> bytes:
+    """Decompress a request body, refusing to inflate past limit bytes"""
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = decompressor.decompress(data, limit or 0)
+        if decompressor.unconsumed_tail:
+            raise OverflowError
+        if not decompressor.eof:
+            raise gzip.BadGzipFile("Truncated gzip body")
+        return data
+
+    if encoding == "zstd":
+        import zstandard
+
+        reader = zstandard.ZstdDecompressor().stream_reader(BytesIO(data))
+        data = reader.read(limit + 1) if limit else reader.readall()
+        if limit and len(data) > limit:
+            raise OverflowError
+        return data
+
+    raise LookupError(encoding)
+
+
+def decompress_request(request):
+    """Replace a compressed request body with the decompressed one.
+
+    Returns an error response when the body can not be decompressed.
+    """
+    encoding = request.META.get("HTTP_CONTENT_ENCODING", "identity").lower()
+    if encoding == "identity":
+        return None
+
+    try:
+        data = decompress(request.body, encoding, settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+    except (LookupError, ImportError):
+        return JsonResponse(
+            {"detail": f"Unsupported Content-Encoding: {encoding}"}, status=415
+        )
+    except OverflowError:
+        return JsonResponse({"detail": "Request body too large"}, status=413)
+    except Exception:
+        logger.debug("Unable to decompress the request body", exc_info=True)
+        return JsonResponse({"detail": "Invalid compressed body"}, status=400)
+
+    request._body = data
+    request._stream = BytesIO(data)
+    request.META["CONTENT_LENGTH"] = str(len(data))
+    del request.META["HTTP_CONTENT_ENCODING"]
+    return None
+
+
+@sync_and_async_middleware
+def decompress_middleware(get_response):
+    """Accept gzip and zstd request bodies (Content-Encoding) from the monitor"""
+
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            return decompress_request(request) or await get_response(request)
+
+    else:
+
+        def middleware(request):
+            return decompress_request(request) or get_response(request)
+
+    return middleware
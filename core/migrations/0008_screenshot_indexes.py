@@ -0,0 +1,29 @@
+# Generated by Django 4.1.3 on 2026-10-19 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_remove_screenshot_binary_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='screenshot',
+            index=models.Index(fields=['-timestamp', '-id'], name='screenshot_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='screenshot',
+            index=models.Index(fields=['screenshot_type', '-timestamp', '-id'], name='screenshot_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='screenshot',
+            index=models.Index(condition=models.Q(('is_nsfw', True)), fields=['-timestamp', '-id'], name='screenshot_nsfw_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='screenshot',
+            index=models.Index(condition=models.Q(('is_profane', True)), fields=['-timestamp', '-id'], name='screenshot_profane_ts_idx'),
+        ),
+    ]
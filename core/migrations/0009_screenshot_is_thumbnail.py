@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-19 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_screenshot_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='screenshot',
+            name='is_thumbnail',
+            field=models.BooleanField(default=False, help_text='The image was replaced by a thumbnail by the retention job'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.1.3 on 2026-10-19 07:20
+
+from django.db import migrations
+
+# External content FTS5 index over core_screenshot - only the index is stored,
+# the text is read from core_screenshot. The triggers keep it in sync.
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_screenshot_fts USING fts5(
+        title,
+        excutable_name,
+        content='core_screenshot',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_screenshot_fts_ai AFTER INSERT ON core_screenshot BEGIN
+        INSERT INTO core_screenshot_fts(rowid, title, excutable_name)
+        VALUES (new.id, new.title, new.excutable_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_screenshot_fts_ad AFTER DELETE ON core_screenshot BEGIN
+        INSERT INTO core_screenshot_fts(core_screenshot_fts, rowid, title, excutable_name)
+        VALUES ('delete', old.id, old.title, old.excutable_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_screenshot_fts_au
+    AFTER UPDATE OF title, excutable_name ON core_screenshot BEGIN
+        INSERT INTO core_screenshot_fts(core_screenshot_fts, rowid, title, excutable_name)
+        VALUES ('delete', old.id, old.title, old.excutable_name);
+        INSERT INTO core_screenshot_fts(rowid, title, excutable_name)
+        VALUES (new.id, new.title, new.excutable_name);
+    END
+    """,
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS core_screenshot_fts_ai",
+    "DROP TRIGGER IF EXISTS core_screenshot_fts_ad",
+    "DROP TRIGGER IF EXISTS core_screenshot_fts_au",
+    "DROP TABLE IF EXISTS core_screenshot_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_screenshot_is_thumbnail'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FTS_SQL, reverse_sql=DROP_FTS_SQL),
+    ]
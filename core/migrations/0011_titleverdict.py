@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-19 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_screenshot_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleVerdict',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.TextField(unique=True)),
+                ('is_profane', models.BooleanField()),
+                ('version', models.CharField(help_text='Version of the word list', max_length=16)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
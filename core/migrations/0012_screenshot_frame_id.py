@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-19 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_titleverdict'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='screenshot',
+            name='frame_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Id of the frame given by the monitor', max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='screenshot',
+            name='unchanged_since',
+            field=models.CharField(blank=True, help_text='The frame was the same as the frame with this frame_id - no image', max_length=32, null=True),
+        ),
+    ]
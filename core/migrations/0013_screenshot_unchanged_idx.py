@@ -0,0 +1,17 @@
+# Generated by Django 4.1.3 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_screenshot_frame_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='screenshot',
+            index=models.Index(condition=models.Q(('unchanged_since__isnull', False)), fields=['unchanged_since'], name='screenshot_unchanged_idx'),
+        ),
+    ]
@@ -26,9 +26,45 @@ class Screenshot(models.Model):
     is_nsfw = models.BooleanField(null=True, blank=True)
     is_profane = models.BooleanField(null=True, blank=True)
     nsfw_detection = models.JSONField(default=list, blank=True, null=True, help_text="NSFW detection results")
+    is_thumbnail = models.BooleanField(default=False, help_text="The image was replaced by a thumbnail by the retention job")
+    frame_id = models.CharField(max_length=32, null=True, blank=True, db_index=True, help_text="Id of the frame given by the monitor")
+    unchanged_since = models.CharField(max_length=32, null=True, blank=True, help_text="The frame was the same as the frame with this frame_id - no image")
     
     timestamp = models.DateTimeField(auto_now_add=True,)
 
+    class Meta:
+        indexes = [
+            # Latest screenshot lookup in post_process and the admin timeline
+            models.Index(
+                fields=["-timestamp", "-id"],
+                name="screenshot_timestamp_idx",
+            ),
+            # Admin screenshot_type filter ordered by time
+            models.Index(
+                fields=["screenshot_type", "-timestamp", "-id"],
+                name="screenshot_type_ts_idx",
+            ),
+            # NSFW only timeline - partial index, only NSFW rows are indexed
+            models.Index(
+                fields=["-timestamp", "-id"],
+                condition=models.Q(is_nsfw=True),
+                name="screenshot_nsfw_ts_idx",
+            ),
+            # Profane only timeline - partial index, only profane rows are indexed
+            models.Index(
+                fields=["-timestamp", "-id"],
+                condition=models.Q(is_profane=True),
+                name="screenshot_profane_ts_idx",
+            ),
+            # Unchanged frames of a frame in update_unchanged - partial index,
+            # most rows have no unchanged_since
+            models.Index(
+                fields=["unchanged_since"],
+                condition=models.Q(unchanged_since__isnull=False),
+                name="screenshot_unchanged_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
     
@@ -41,6 +77,10 @@ class Screenshot(models.Model):
     
 
     def run_nsfw_detection(self):
+        if self.unchanged_since is not None:
+            self.inherit_nsfw_detection()
+            return
+
         if self.base64_image is None:
             self.is_nsfw = False
             self.save()
@@ -52,34 +92,70 @@ class Screenshot(models.Model):
             return
 
 
+        is_nsfw, detection = self.detect_nsfw()
+        self.is_nsfw = is_nsfw
+        if is_nsfw:
+            self.nsfw_detection = detection
+        
+        self.save()
+        logger.info(f"NSFW detection complete for {self.title} - {self.is_nsfw}")
+        if self.frame_id:
+            self.update_unchanged()
+
+        if not self.is_nsfw:
+            if self.screenshot_type == "NSFW":
+                self.delete()
+            elif self.screenshot_type == "NSFW_META":
+                self.base64_image = None
+                self.save()
+
+    def inherit_nsfw_detection(self):
+        """Take the verdict of the unchanged frame instead of processing it again.
+
+        A missing frame is taken as not NSFW - the NSFW screenshots that
+        are not NSFW are deleted. A frame still being processed passes its
+        verdict on when done, see update_unchanged.
+        """
+        original = Screenshot.objects.filter(frame_id=self.unchanged_since).order_by("-id").first()
+        self.is_nsfw = bool(original and original.is_nsfw)
+        if self.is_nsfw:
+            self.nsfw_detection = original.nsfw_detection
+        pending = original is not None and original.is_nsfw is None
+        if not self.is_nsfw and not pending and self.screenshot_type == "NSFW":
+            self.delete()
+            return
+        self.save()
+
+    def update_unchanged(self):
+        """Pass the verdict on to the unchanged frames recorded while this
+        one was processed"""
+        unchanged = Screenshot.objects.filter(unchanged_since=self.frame_id)
+        if self.is_nsfw:
+            unchanged.update(is_nsfw=True, nsfw_detection=self.nsfw_detection)
+        else:
+            unchanged.filter(screenshot_type="NSFW").delete()
+
+    def detect_nsfw(self, classifier=None, detector=None) -> tuple[bool, dict | None]:
+        """Run the NSFW models on the image without saving.
+
+        Returns (is_nsfw, detector results). The models can be passed in to
+        reuse them across screenshots.
+        """
         image = self.image
         sub_images = []
         
         for x, y, w, h in self.create_bounding_boxes():
             sub_images.append(image[y:y + h, x:x + w])
         
-        classifier =  Classifier()
+        classifier = classifier or Classifier()
         for i in sub_images:
             if classifier.is_nsfw(i):
                 # Run Detector on the images
-                detector = Detector()
+                detector = detector or Detector()
                 detector_results = detector.is_nsfw(i)
                 if detector_results['is_nsfw']:
-                    self.is_nsfw = True
-                    self.nsfw_detection = detector_results
-                    break
-        else:
-            self.is_nsfw = False
-        
-        self.save()
-        logger.info(f"NSFW detection complete for {self.title} - {self.is_nsfw}")
-
-        if not self.is_nsfw:
-            if self.screenshot_type == "NSFW":
-                self.delete()
-            elif self.screenshot_type == "NSFW_META":
-                self.base64_image = None
-                self.save()
+                    return True, detector_results
+        return False, None
 
     def run_profanity_detection(self):  
         if self.is_profane is None:
@@ -93,6 +169,17 @@ class Screenshot(models.Model):
         return get_bounding_boxes(self.image)
 
 
+class TitleVerdict(models.Model):
+    """Profanity verdict of a window title - keeps the verdict cache warm across restarts"""
+    title = models.TextField(unique=True)
+    is_profane = models.BooleanField()
+    version = models.CharField(max_length=16, help_text="Version of the word list")
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
+
+
 @django.dispatch.receiver(models.signals.post_save, sender=Screenshot)
 def post_process(sender, instance: Screenshot, **kwargs):
     instance.run_profanity_detection()
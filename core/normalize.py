@@ -0,0 +1,176 @@
+import logging
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Common digit and symbol substitutions - only applied inside words with a letter
+LEET = str.maketrans({
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "8": "b",
+    "9": "g",
+    "@": "a",
+    "$": "s",
+    "!": "i",
+    "+": "t",
+})
+SYMBOLS = "@$!+"
+
+# Letters from other scripts that look like latin letters.
+# Only applied inside words that also have a latin letter, so real
+# Cyrillic or Greek words are left alone.
+CONFUSABLES = str.maketrans({
+    "а": "a", "в": "b", "е": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j",
+    "ѕ": "s", "ԁ": "d", "ɡ": "g", "α": "a", "β": "b", "ε": "e", "ι": "i",
+    "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+})
+
+TOKEN = re.compile(r"[^\W_]+|[" + re.escape(SYMBOLS) + "]+")
+WORD = re.compile(r"(?:[^\W_]|[" + re.escape(SYMBOLS) + "])+")
+EDGE_SYMBOLS = re.compile(
+    r"(?<![^\W_])[" + re.escape(SYMBOLS) + "]+|[" + re.escape(SYMBOLS) + r"]+(?![^\W_])"
+)
+# "!" closing a word - punctuation after a substituted letter ("shi+!")
+TRAILING_BANGS = re.compile(r"!+(?![^\W_]|[" + re.escape(SYMBOLS) + "])")
+ASCII_LETTER = re.compile(r"[a-z]")
+SYMBOL = re.compile("[" + re.escape(SYMBOLS) + "]")
+
+
+class Normalized:
+    """A normalized text.
+
+    Words are separated by a single space, runs of the same letter are
+    squeezed to one letter. counts[i] is the length of the run and spans[i]
+    the (start, end) offsets of chars[i] in the original text.
+    """
+
+    def __init__(
+        self, chars: str, counts: list[int], spans: list[tuple], joined: bool
+    ) -> None:
+        self.chars = chars
+        self.counts = counts
+        self.spans = spans
+        self.joined = joined  # Spaced single letters were joined
+
+
+def fold(c: str) -> str:
+    """Fold the case and strip the accents of a single character"""
+    if c.isascii():
+        return c.lower()
+    c = unicodedata.normalize("NFKD", c)
+    return "".join(x for x in c if not unicodedata.combining(x)).casefold()
+
+
+def words(s: str):
+    """Yield (separator before, folded word, original offset of every char)"""
+    ascii = s.isascii()
+    folded = s.lower() if ascii else None
+    end = 0
+    for match in WORD.finditer(s):
+        start = match.start()
+        if ascii:
+            text, offsets = folded[start:match.end()], range(start, match.end())
+        else:
+            chars, offsets = [], []
+            for i in range(start, match.end()):
+                c = fold(s[i])
+                chars.append(c)
+                offsets.extend([i] * len(c))
+            text = "".join(chars)
+        yield s[end:start], text, offsets
+        end = match.end()
+
+
+def canonical(text: str, offsets) -> tuple[str, list]:
+    """Apply the substitutions to a word"""
+    if ASCII_LETTER.search(text):
+        text = text.translate(CONFUSABLES)
+    if any(c.isalpha() for c in text):
+        return text.translate(LEET), offsets
+    if SYMBOL.search(text):
+        # No letter - symbols are separators and numbers stay numbers
+        kept = [(c, i) for c, i in zip(text, offsets) if c not in SYMBOLS]
+        return "".join(c for c, _ in kept), [i for _, i in kept]
+    return text, offsets
+
+
+def normalize(s: str, join: bool = True) -> Normalized:
+    """Normalize a text for matching"""
+    tokens = []
+    separators = []
+    dropped = False
+    for separator, text, offsets in words(s):
+        text, offsets = canonical(text, offsets)
+        if not text:
+            dropped = True
+            continue
+        # A dropped word between two words never joins them
+        separators.append(None if dropped else separator)
+        tokens.append((text, offsets))
+        dropped = False
+
+    # Join spaced single letters "a s s", "f.u.c.k" -> "ass", "fuck".
+    # The letters must be split by the same separator, so "x-a_s_s-y" is
+    # "x ass y".
+    joined = []
+    i = 0
+    while i < len(tokens):
+        j = i
+        if join and len(tokens[i][0]) == 1 and i + 1 < len(tokens):
+            separator = separators[i + 1]
+            while (
+                j + 1 < len(tokens)
+                and len(tokens[j + 1][0]) == 1
+                and separator is not None
+                and separators[j + 1] == separator
+            ):
+                j += 1
+        if j - i + 1 >= 3:
+            run = tokens[i:j + 1]
+            text = "".join(t for t, _ in run)
+            joined.append((text, [i for _, offsets in run for i in offsets]))
+            i = j + 1
+        else:
+            joined.append(tokens[i])
+            i += 1
+
+    # Squeeze repeated letters, keep the run length
+    chars, counts, spans = [], [], []
+    for text, offsets in joined:
+        if chars:
+            chars.append(" ")
+            counts.append(1)
+            spans.append(None)
+        for c, i in zip(text, offsets):
+            if chars and chars[-1] == c:
+                counts[-1] += 1
+                spans[-1] = (spans[-1][0], i + 1)
+            else:
+                chars.append(c)
+                counts.append(1)
+                spans.append((i, i + 1))
+    return Normalized("".join(chars), counts, spans, len(joined) < len(tokens))
+
+
+def variants(s: str) -> list[str]:
+    """The readings of s to match.
+
+    A symbol can be a substituted letter ("sh!t") or punctuation ("shit!"),
+    so texts with symbols are also read with the "!" closing a word, then
+    the symbols at the edge of a word, and then all symbols, as separators.
+    Offsets are unchanged.
+    """
+    if not SYMBOL.search(s):
+        return [s]
+    return [
+        s,
+        TRAILING_BANGS.sub(lambda m: " " * len(m.group()), s),
+        EDGE_SYMBOLS.sub(lambda m: " " * len(m.group()), s),
+        SYMBOL.sub(" ", s),
+    ]
@@ -1,24 +1,29 @@
+# numpy, cv2, PIL and onnxruntime are imported when a model is loaded or run
+from __future__ import annotations
+
 import logging
 from pathlib import Path
-
-import numpy as np
-from PIL import Image
-import cv2 as cv
+from typing import TYPE_CHECKING
 
 from openchaver.dirs import get_data_dir
 from .image_utils import match_size, resize_image
 
+if TYPE_CHECKING:
+    import numpy as np
 
-model_dir = get_data_dir() / "models"
-model_dir.mkdir(parents=True, exist_ok=True)
 
 DETECTION_MODEL_URL = 'https://pub-43a5d92b0b0b4908a9aec2a745986a23.r2.dev/detector_v2_default_checkpoint.onnx'  # noqa: E501
 DETECTION_MODEL_SHA256_HASH = "D4BE1C504BE61851D9745E6DA8FA09455EB39B8856626DD6B5CA413C9E8B1578"  # noqa: E501
-DETECTION_MODEL_PATH = model_dir / 'detect.onnx'
+DETECTION_MODEL_NAME = 'detect.onnx'
 
 CLASSIFICATION_MODEL_URL = 'https://pub-43a5d92b0b0b4908a9aec2a745986a23.r2.dev/open-nsfw.onnx'  # noqa: E501
 CLASSIFICATION_MODEL_SHA256_HASH = "864BB37BF8863564B87EB330AB8C785A79A773F4E7C43CB96DB52ED8611305FA"  # noqa: E501
-CLASSIFICATION_MODEL_PATH = model_dir / 'classify.onnx'
+CLASSIFICATION_MODEL_NAME = 'classify.onnx'
+
+
+def get_model_dir() -> Path:
+    """The directory of the models, created on first use"""
+    return get_data_dir("models")
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +79,7 @@ class Detector:
 
     def __init__(self):
         import onnxruntime
-        model_file = DETECTION_MODEL_PATH
+        model_file = get_model_dir() / DETECTION_MODEL_NAME
         logger.debug(f"Loading detection model from {model_file}")
 
         if not model_file.exists():
@@ -113,6 +118,8 @@ class Detector:
         batch_size=5,
     ) -> list[dict]:
         """Detect objects in an image."""
+        import numpy as np
+        from PIL import Image
 
         # Function to preprocess the image
         def preprocess_image(
@@ -207,7 +214,7 @@ class Detector:
 class Classifier:
 
     def __init__(self):
-        model_file = CLASSIFICATION_MODEL_PATH
+        model_file = get_model_dir() / CLASSIFICATION_MODEL_NAME
         logger.info(f"Loading classification model from {model_file}")
 
         if not model_file.exists():
@@ -217,10 +224,13 @@ class Classifier:
             download_model(CLASSIFICATION_MODEL_URL, model_file,
                            CLASSIFICATION_MODEL_SHA256_HASH)
 
+        import cv2 as cv
         self.lite_model = cv.dnn.readNet(str(model_file))
 
     def classify(self, images: list[np.ndarray], threshold=0.6):
         """Classify an image."""
+        import cv2 as cv
+        import numpy as np
 
         # Preprocess images
         # Copied from
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Screenshot
+
+
+def hot_queries() -> dict:
+    """The Screenshot queries that must be served by an index"""
+    week_ago = timezone.now() - timedelta(days=7)
+    timeline = Screenshot.objects.order_by("-timestamp", "-pk")
+    return {
+        # post_process - latest screenshot with the same title
+        "latest_title": Screenshot.objects.exclude(pk=1).order_by("-timestamp")[:1],
+        # Admin changelist with the list_filter combinations
+        "admin_timeline": timeline[:100],
+        "admin_type": timeline.filter(screenshot_type="NSFW_IMAGE")[:100],
+        "admin_type_week": timeline.filter(
+            screenshot_type="IMAGE", timestamp__gte=week_ago
+        )[:100],
+        "admin_week": timeline.filter(timestamp__gte=week_ago)[:100],
+        "admin_profane": timeline.filter(is_profane=True)[:100],
+        # NSFW only timeline
+        "nsfw_timeline": timeline.filter(is_nsfw=True)[:100],
+        "nsfw_timeline_week": timeline.filter(
+            is_nsfw=True, timestamp__gte=week_ago
+        )[:100],
+        # update_unchanged - the frames unchanged since a frame
+        "unchanged_frames": Screenshot.objects.filter(unchanged_since="0" * 32),
+    }
+
+
+def is_full_scan(plan: str) -> bool:
+    """Check if a query plan scans the table or sorts in a temp b-tree"""
+    for line in plan.splitlines():
+        line = line.strip()
+        if "USE TEMP B-TREE" in line:
+            return True
+        if "SCAN" in line and "INDEX" not in line:
+            return True
+    return False
@@ -0,0 +1,213 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from openchaver.decorators import handle_error, restart_on_exception
+from .image_utils import (
+    create_thumbnail,
+    decode_base64_to_numpy,
+    encode_numpy_to_base64,
+)
+from .models import Screenshot, TitleVerdict
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("thumbnail", "drop_image", "delete")
+
+
+def policy_queryset(policy: dict, now=None):
+    """Select the screenshots a retention policy applies to"""
+    if policy["action"] not in ACTIONS:
+        raise ValueError(f"Unknown retention action: {policy['action']}")
+
+    now = now or timezone.now()
+    queryset = Screenshot.objects.filter(
+        timestamp__lt=now - timedelta(days=policy["days"])
+    )
+    if "types" in policy:
+        queryset = queryset.filter(screenshot_type__in=policy["types"])
+    if "is_nsfw" in policy:
+        queryset = queryset.filter(is_nsfw=policy["is_nsfw"])
+    if "is_profane" in policy:
+        queryset = queryset.filter(is_profane=policy["is_profane"])
+
+    if policy["action"] in ("thumbnail", "drop_image"):
+        queryset = queryset.filter(base64_image__isnull=False)
+    if policy["action"] == "thumbnail":
+        queryset = queryset.filter(is_thumbnail=False)
+    return queryset
+
+
+def database_size() -> int:
+    """Size of the database file in bytes"""
+    with connection.cursor() as cursor:
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+class RetentionReport:
+    def __init__(self) -> None:
+        self.rows = {action: 0 for action in ACTIONS}
+        self.verdicts_pruned = 0
+        self.transactions = 0
+        self.lock_seconds = 0.0
+        self.max_lock_seconds = 0.0
+        self.bytes_reclaimed = 0
+        self.duration = 0.0
+
+    def locked(self, seconds: float) -> None:
+        """Record how long a write transaction held the lock"""
+        self.transactions += 1
+        self.lock_seconds += seconds
+        self.max_lock_seconds = max(self.max_lock_seconds, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "verdicts_pruned": self.verdicts_pruned,
+            "transactions": self.transactions,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "lock_seconds": round(self.lock_seconds, 3),
+            "max_lock_seconds": round(self.max_lock_seconds, 3),
+            "duration": round(self.duration, 3),
+        }
+
+
+def is_incremental_vacuum() -> bool:
+    with connection.cursor() as cursor:
+        return cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def ensure_incremental_vacuum(report: RetentionReport) -> None:
+    """Switch the database to auto_vacuum=INCREMENTAL.
+
+    This needs a full VACUUM once, which locks the whole database until it
+    is done - so it is only run on request (runretention
+    --incremental-vacuum), never by the service. After that free pages are
+    released in small incremental_vacuum steps.
+    """
+    if is_incremental_vacuum():
+        return
+    logger.info("Enabling incremental vacuum - running a full VACUUM once")
+    with connection.cursor() as cursor:
+        start = time.perf_counter()
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
+        report.locked(time.perf_counter() - start)
+
+
+def apply_policy(policy: dict, report: RetentionReport, batch_size: int) -> None:
+    """Apply a policy in batches, one short transaction per batch"""
+    action = policy["action"]
+    queryset = policy_queryset(policy)
+    last_pk = 0
+
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        # Encode the thumbnails before taking the write lock
+        thumbnails = {}
+        if action == "thumbnail":
+            size = settings.RETENTION["THUMBNAIL_SIZE"]
+            images = Screenshot.objects.filter(pk__in=pks).values_list(
+                "pk", "base64_image"
+            )
+            for pk, base64_image in images:
+                try:
+                    image = create_thumbnail(decode_base64_to_numpy(base64_image), size)
+                    thumbnails[pk] = encode_numpy_to_base64(image)
+                except:  # noqa: E722
+                    logger.exception(f"Unable to create a thumbnail for {pk}")
+
+        # QuerySet.update/delete - no post_save analysis is triggered
+        start = time.perf_counter()
+        with transaction.atomic():
+            batch = Screenshot.objects.filter(pk__in=pks)
+            if action == "delete":
+                count, _ = batch.delete()
+            elif action == "drop_image":
+                count = batch.update(base64_image=None)
+            else:
+                count = 0
+                for pk, thumbnail in thumbnails.items():
+                    count += Screenshot.objects.filter(pk=pk).update(
+                        base64_image=thumbnail, is_thumbnail=True
+                    )
+        report.locked(time.perf_counter() - start)
+        report.rows[action] += count
+
+
+def prune_verdicts(report: RetentionReport, batch_size: int) -> None:
+    """Delete the profanity verdicts of the word lists no longer in use"""
+    from .profanity import get_matcher_state
+
+    _, version = get_matcher_state()
+    stale = TitleVerdict.objects.exclude(version=version)
+    while True:
+        pks = list(stale.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        start = time.perf_counter()
+        count, _ = TitleVerdict.objects.filter(pk__in=pks).delete()
+        report.locked(time.perf_counter() - start)
+        report.verdicts_pruned += count
+
+
+def incremental_vacuum(report: RetentionReport, pages: int) -> None:
+    """Release the free pages in small steps"""
+    if not is_incremental_vacuum():
+        # incremental_vacuum is a no-op - the free pages are reused instead
+        logger.info("Incremental vacuum is not enabled, see runretention --incremental-vacuum")
+        return
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        while cursor.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            start = time.perf_counter()
+            # cursor.execute only steps the pragma once - one page.
+            # executescript runs it to completion.
+            connection.connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+            report.locked(time.perf_counter() - start)
+
+
+def run_retention(policies: list | None = None, enable_incremental_vacuum: bool = False) -> dict:
+    """Apply the retention policies and vacuum the freed space"""
+    config = settings.RETENTION
+    policies = config["POLICIES"] if policies is None else policies
+    report = RetentionReport()
+    start = time.perf_counter()
+
+    size_before = database_size()
+    if enable_incremental_vacuum:
+        ensure_incremental_vacuum(report)
+
+    for policy in policies:
+        apply_policy(policy, report, config["BATCH_SIZE"])
+    prune_verdicts(report, config["BATCH_SIZE"])
+
+    incremental_vacuum(report, config["VACUUM_PAGES"])
+    report.bytes_reclaimed = size_before - database_size()
+    report.duration = time.perf_counter() - start
+
+    logger.info(f"Retention complete: {report.as_dict()}")
+    return report.as_dict()
+
+
+@restart_on_exception
+@handle_error
+def keep_retention_running():
+    """Run the retention job every RETENTION["INTERVAL"] seconds"""
+    while True:
+        run_retention()
+        time.sleep(settings.RETENTION["INTERVAL"])
@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+
+TESTDATA_DIR = Path(__file__).parent / "testdata"
+
+SAMPLE_WINDOWS = [
+    ("{} - Google Chrome", "chrome.exe"),
+    ("{} - Mozilla Firefox", "firefox.exe"),
+    ("{} - Visual Studio Code", "Code.exe"),
+    ("{} - Word", "WINWORD.EXE"),
+    ("{} - Excel", "EXCEL.EXE"),
+    ("{} - Outlook", "OUTLOOK.EXE"),
+    ("{} - File Explorer", "explorer.exe"),
+    ("{} - Notepad", "notepad.exe"),
+]
+SAMPLE_SUBJECTS = [
+    "Inbox (3) - user@example.com - Gmail",
+    "YouTube",
+    "How to cook pasta - Google Search",
+    "Quarterly report final v2.docx",
+    "budget_2022.xlsx",
+    "main.py - openchaver",
+    "Downloads",
+    "Class assignment: Scunthorpe history",
+    "Amazon.com: Online Shopping",
+    "Weather forecast for the weekend",
+    "Meeting notes 10/14",
+    "r/python - Reddit",
+]
+
+
+def sample_titles(n: int, profane_ratio: float = 0.05, seed: int = 0, words=None) -> list:
+    """Realistic window titles, some of them with a bad word"""
+    import random
+    from .profanity import BAD_WORDS
+
+    words = words or BAD_WORDS
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(n):
+        subject = rng.choice(SAMPLE_SUBJECTS)
+        if rng.random() < profane_ratio:
+            subject = f"{subject} {rng.choice(words).strip()}"
+        titles.append(rng.choice(SAMPLE_WINDOWS)[0].format(subject))
+    return titles
+
+
+def sample_screenshot(width: int = 1280, height: int = 720, seed: int = 0) -> str:
+    """A window-like image - flat panels and text, encoded like the monitor does"""
+    import cv2 as cv
+    import numpy as np
+    import random
+    from .image_utils import encode_numpy_to_base64
+
+    rng = random.Random(seed)
+    image = np.full((height, width, 3), 245, dtype=np.uint8)
+    cv.rectangle(image, (0, 0), (width, 40), (60, 60, 60), -1)
+    cv.rectangle(image, (0, 40), (220, height), (230, 230, 235), -1)
+    for y in range(70, height - 20, 24):
+        text = rng.choice(SAMPLE_SUBJECTS)
+        cv.putText(image, text, (240, y), cv.FONT_HERSHEY_SIMPLEX, 0.5, (20, 20, 20), 1)
+    return encode_numpy_to_base64(image)
+
+
+def sample_frames(count: int = 200, seed: int = 0) -> list:
+    """Window frames for the NSFW prefilter - plain windows, windows showing
+    a photo and windows showing skin, from large to avatar sized"""
+    import cv2 as cv
+    import numpy as np
+    import random
+    from .image_utils import decode_base64_to_numpy
+
+    rng = random.Random(seed)
+    noise = np.random.default_rng(seed)
+    windows = [decode_base64_to_numpy(sample_screenshot(seed=n)) for n in range(8)]
+    frames = []
+    for n in range(count):
+        image = windows[n % len(windows)].copy()
+        height, width = image.shape[:2]
+        kind = n % 4
+        if kind:
+            # A textured photo in the window - skin toned for kinds 2 and 3
+            side = rng.randint(40, 160) if kind == 3 else rng.randint(width // 8, width // 2)
+            x, y = rng.randint(240, width - side - 1), rng.randint(41, height - side - 1)
+            color = (120, 160, 220) if kind > 1 else (rng.randint(120, 200), rng.randint(60, 140), 40)
+            patch = np.clip(noise.normal(color, 40, (side, side, 3)), 0, 255).astype(np.uint8)
+            image[y:y + side, x:x + side] = cv.GaussianBlur(patch, (7, 7), 0)
+        frames.append(image)
+    return frames
+
+
+def original_bad_words() -> list[str]:
+    """The 947 entries of the word list before it was shortened"""
+    return json.loads((TESTDATA_DIR / "original_bad_words.json").read_text(encoding="utf8"))
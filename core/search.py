@@ -0,0 +1,40 @@
+import logging
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# External content FTS5 index over core_screenshot, created by the
+# 0010_screenshot_fts migration. Triggers keep it in sync with the table.
+FTS_TABLE = "core_screenshot_fts"
+
+
+def fts_query(term: str) -> str:
+    """Turn user input into an FTS5 query - every word is a quoted prefix"""
+    words = [w.replace('"', '""') for w in term.split()]
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def search_screenshots(queryset, term: str):
+    """Filter a Screenshot queryset with the FTS index, best match first"""
+    query = fts_query(term)
+    if not query:
+        return queryset
+
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f"{FTS_TABLE}.rowid = core_screenshot.id",
+            f"{FTS_TABLE} MATCH %s",
+        ],
+        params=[query],
+        select={"search_rank": f"bm25({FTS_TABLE})"},
+    ).order_by("search_rank", "-timestamp")
+
+
+def rebuild_search_index() -> int:
+    """Rebuild the FTS index from core_screenshot"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        return cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}").fetchone()[0]
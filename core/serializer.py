@@ -5,4 +5,14 @@ from .models import Screenshot
 class ScreenshotSerializer(serializers.ModelSerializer):
     class Meta:
         model = Screenshot
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class IngestSerializer(serializers.ModelSerializer):
+    """The fields the monitor uploads"""
+    # Capture time of a spooled screenshot - defaults to the time it is written
+    timestamp = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Screenshot
+        fields = ('title', 'excutable_name', 'base64_image', 'screenshot_type', 'timestamp', 'frame_id', 'unchanged_since')
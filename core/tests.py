@@ -0,0 +1,265 @@
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import profanity
+from .backfill import run_backfill, write_results
+from .benchmarks import STARTUP_COMMANDS, startup_imports
+from .ingest import IngestQueue
+from .matcher import WordMatcher
+from .models import Screenshot, TitleVerdict
+from .profanity import BAD_WORDS
+from .queryplans import hot_queries, is_full_scan
+from .retention import RetentionReport, is_incremental_vacuum, prune_verdicts, run_retention
+from .samples import original_bad_words
+from .watchdog import MonitorRegistry
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_an_index(self):
+        for name, queryset in hot_queries().items():
+            plan = queryset.explain()
+            with self.subTest(query=name, plan=plan):
+                self.assertFalse(is_full_scan(plan))
+
+
+class WordListTests(SimpleTestCase):
+    """The shortened word list must match everything the original did"""
+
+    CONTEXTS = (
+        "{}",
+        "{} video",
+        "{} - Google Search",
+        "Watching {} videos | YouTube - Google Chrome",
+        "re: {}, again",
+        "({})",
+        "{}!",
+        '"{}"',
+        "{}.",
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.original = original_bad_words()
+        # The original implementation
+        cls.regex = re.compile(r"\b" + r"\b|\b".join(cls.original) + r"\b", re.IGNORECASE)
+        cls.matcher = WordMatcher(BAD_WORDS)
+
+    def test_fixture_is_the_original_list(self):
+        self.assertEqual(len(self.original), 947)
+
+    def test_original_matches_are_kept(self):
+        texts = set()
+        for word in self.original:
+            for variant in {word, word.strip(), word.upper(), word.strip().title()}:
+                texts.update(context.format(variant) for context in self.CONTEXTS)
+
+        checked = 0
+        for text in sorted(texts):
+            if self.regex.search(text) is None:
+                continue
+            checked += 1
+            with self.subTest(text=text):
+                self.assertIsNotNone(self.matcher.search(text))
+        # Most of the texts are matched by the original regex
+        self.assertGreater(checked, len(texts) // 2)
+
+    def test_clean_titles_stay_clean(self):
+        for text in (
+            "Inbox (3) - Gmail",
+            "Assessment results - Google Docs",
+            "Scunthorpe United - Wikipedia",
+            "Cook book - Amazon.com",
+            "Classic cars for sale",
+        ):
+            with self.subTest(text=text):
+                self.assertIsNone(self.matcher.search(text))
+
+
+class VerdictPersistenceTests(TestCase):
+    def setUp(self):
+        profanity.flush_verdicts()
+
+    def persist(self, title: str, version: str = "current") -> None:
+        profanity.persist_verdict(title, False, version)
+
+    @override_settings(PROFANITY={**settings.PROFANITY, "PERSIST_INTERVAL": 3600})
+    def test_pending_verdicts_are_flushed(self):
+        self.persist("Inbox - Gmail")
+        self.assertFalse(TitleVerdict.objects.exists())
+        profanity.flush_verdicts()
+        self.assertEqual(TitleVerdict.objects.get().title, "Inbox - Gmail")
+
+    @override_settings(PROFANITY={**settings.PROFANITY, "PERSIST_INTERVAL": 0})
+    def test_old_batch_is_written(self):
+        self.persist("Inbox - Gmail")
+        self.assertTrue(TitleVerdict.objects.exists())
+
+    def test_retention_prunes_stale_versions(self):
+        TitleVerdict.objects.create(title="old", is_profane=False, version="old")
+        TitleVerdict.objects.create(title="new", is_profane=False, version="current")
+        report = RetentionReport()
+        with mock.patch.object(profanity, "get_matcher_state", return_value=(None, "current")):
+            prune_verdicts(report, batch_size=1)
+        self.assertEqual(list(TitleVerdict.objects.values_list("title", flat=True)), ["new"])
+        self.assertEqual(report.verdicts_pruned, 1)
+
+
+class IncrementalVacuumTests(TransactionTestCase):
+    def test_vacuum_only_on_request(self):
+        TitleVerdict.objects.bulk_create(
+            TitleVerdict(title=f"{n}" * 200, is_profane=False, version="old") for n in range(2000)
+        )
+        TitleVerdict.objects.all().delete()
+
+        report = run_retention(policies=[])
+        self.assertFalse(is_incremental_vacuum())
+        self.assertEqual(report["transactions"], 0)
+
+        report = run_retention(policies=[], enable_incremental_vacuum=True)
+        self.assertTrue(is_incremental_vacuum())
+        # The full VACUUM released the pages of the deleted rows
+        self.assertGreater(report["bytes_reclaimed"], 0)
+
+
+class MatcherVersionTests(SimpleTestCase):
+    def test_code_change_changes_the_version(self):
+        version = profanity.words_version(b"ass\n")
+        with mock.patch.object(profanity, "code_version", return_value=b"other code"):
+            self.assertNotEqual(profanity.words_version(b"ass\n"), version)
+        self.assertNotEqual(profanity.words_version(b"arse\n"), version)
+
+
+class BackfillTests(TestCase):
+    def screenshot(self, screenshot_type: str, **fields) -> Screenshot:
+        fields = {
+            "title": "Photos",
+            "excutable_name": "chrome.exe",
+            "screenshot_type": screenshot_type,
+            "base64_image": "image",
+            "is_nsfw": True,
+            "is_profane": False,
+            "nsfw_detection": {"is_nsfw": True},
+            **fields,
+        }
+        # bulk_create sends no post_save - the analysis is not run
+        return Screenshot.objects.bulk_create([Screenshot(**fields)])[0]
+
+    def test_rows_no_longer_nsfw(self):
+        kept = self.screenshot("NSFW_IMAGE", frame_id="a")
+        meta = self.screenshot("NSFW_META")
+        deleted = self.screenshot("NSFW")
+        duplicate = self.screenshot("NSFW_IMAGE", unchanged_since="a", base64_image=None)
+        write_results([
+            (pk, {"is_nsfw": False, "nsfw_detection": []})
+            for pk in (kept.pk, meta.pk, deleted.pk)
+        ])
+
+        kept.refresh_from_db()
+        self.assertEqual((kept.is_nsfw, kept.nsfw_detection, kept.base64_image), (False, [], "image"))
+        meta.refresh_from_db()
+        self.assertIsNone(meta.base64_image)
+        self.assertFalse(Screenshot.objects.filter(pk=deleted.pk).exists())
+        duplicate.refresh_from_db()
+        self.assertEqual((duplicate.is_nsfw, duplicate.nsfw_detection), (False, []))
+
+    def test_backfill_runs_again(self):
+        for n in range(30):
+            self.screenshot("IMAGE", title=f"Docs {n}", is_profane=None)
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch(
+            "core.backfill.get_data_dir", return_value=Path(tmp)
+        ):
+            self.assertEqual(run_backfill("profanity", workers=1, batch_size=8)["rows"], 30)
+            self.assertFalse(Screenshot.objects.filter(is_profane__isnull=True).exists())
+
+            # The thresholds changed - the next run analyzes everything again
+            Screenshot.objects.update(is_profane=None)
+            self.assertEqual(run_backfill("profanity", workers=1, batch_size=8)["rows"], 30)
+            self.assertFalse(Screenshot.objects.filter(is_profane__isnull=True).exists())
+
+
+class IngestQueueTests(SimpleTestCase):
+    def test_stop_writes_the_queued_screenshots(self):
+        ingest = IngestQueue(maxsize=8)
+        with mock.patch("core.ingest.Screenshot") as model:
+            model.return_value.save.side_effect = lambda: time.sleep(0.05)
+            thread = threading.Thread(target=ingest.run)
+            thread.start()
+            self.assertTrue(ingest.put_many([(str(n), {"title": "Docs"}) for n in range(5)]))
+            ingest.stop()
+            self.assertFalse(ingest.put("late", {"title": "Docs"}))
+            thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(ingest.written, 5)
+        self.assertEqual(ingest.rejected, 1)
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_commands_do_not_import_the_pipelines(self):
+        for command in STARTUP_COMMANDS:
+            with self.subTest(command=command):
+                self.assertEqual(startup_imports(command)["heavy"], [])
+
+
+class FakeScanner:
+    """The processes as pid -> (create time, username, command)"""
+
+    def __init__(self, processes: dict) -> None:
+        self.processes = processes
+        self.scans = 0
+
+    def create_time(self, pid: int) -> float | None:
+        return self.processes[pid][0] if pid in self.processes else None
+
+    def find(self, username: str, command: list) -> tuple | None:
+        self.scans += 1
+        for pid, (create_time, user, cmdline) in self.processes.items():
+            if user == username and cmdline[1:] == command[1:]:
+                return pid, create_time
+        return None
+
+
+class MonitorRegistryTests(SimpleTestCase):
+    MONITOR = ["python.exe", "manage.py", "runmonitor"]
+
+    def registry(self, processes: dict) -> tuple:
+        scanner = FakeScanner(processes)
+        return MonitorRegistry(scanner, command=self.MONITOR), scanner
+
+    def test_registered_monitor_is_alive(self):
+        registry, scanner = self.registry({100: (1.0, "alice", self.MONITOR)})
+        registry.register(1, 100)
+        self.assertTrue(registry.is_running(1, "alice"))
+        self.assertEqual(scanner.scans, 0)
+
+    def test_reused_pid_is_dead(self):
+        processes = {100: (1.0, "alice", self.MONITOR)}
+        registry, scanner = self.registry(processes)
+        registry.register(1, 100)
+        processes[100] = (2.0, "alice", ["notepad.exe"])
+        self.assertFalse(registry.is_running(1, "alice"))
+        # Not adopted again by the scan either
+        self.assertFalse(registry.is_running(1, "alice"))
+        self.assertEqual(registry.monitors, {})
+
+    def test_empty_registry_scans(self):
+        registry, scanner = self.registry({100: (1.0, "bob", self.MONITOR)})
+        self.assertFalse(registry.is_running(1, "alice"))
+        self.assertEqual(scanner.scans, 1)
+
+    def test_scanned_monitor_is_adopted(self):
+        registry, scanner = self.registry({100: (1.0, "alice", self.MONITOR)})
+        self.assertTrue(registry.is_running(1, "alice"))
+        self.assertEqual(registry.monitors, {1: (100, 1.0)})
+        # The next check is a lookup, no scan
+        self.assertTrue(registry.is_running(1, "alice"))
+        self.assertEqual(scanner.scans, 1)
@@ -1,9 +1,12 @@
 from django.urls import path
 
 from rest_framework import routers
-from .views import ScreenshotViewSet
+from .views import ScreenshotViewSet, ingest, stats
 
 router = routers.DefaultRouter()
 router.register(r'screenshots', ScreenshotViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('ingest/', ingest, name='ingest'),
+    path('stats/', stats, name='stats'),
+] + router.urls
@@ -1,10 +1,93 @@
+import json
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from openchaver.supervisor import service_stats
+
+from .ingest import ingest_queue
 from .models import Screenshot
-from .serializer import ScreenshotSerializer
+from .profanity import cache_stats
+from .search import search_screenshots
+from .serializer import ScreenshotSerializer, IngestSerializer
 
 class ScreenshotViewSet(ModelViewSet):
     queryset = Screenshot.objects.all()
     serializer_class = ScreenshotSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?search= - full-text search on the title and executable name
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_screenshots(queryset, search)
+        return queryset
+
+
+@api_view(['GET'])
+def stats(request):
+    """Runtime statistics of the service"""
+    return Response({
+        "ingest": ingest_queue.stats(),
+        "profanity_cache": cache_stats(),
+        "services": service_stats(),
+    })
+
+
+async def ingest(request):
+    """Validate screenshots, enqueue them and acknowledge with 202 Accepted.
+
+    The body is a screenshot or a list of them (the monitor's spool flushes
+    in batches). A batch is queued whole or rejected with 503; the invalid
+    screenshots of a batch are reported and skipped.
+
+    Under ASGI the request body is streamed into a spooled file by the
+    handler, so the event loop is never blocked on a slow client.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "Invalid JSON"}, status=400)
+
+    many = isinstance(payload, list)
+    if many and len(payload) > settings.INGEST["MAX_BATCH"]:
+        return JsonResponse(
+            {"detail": f"More than {settings.INGEST['MAX_BATCH']} screenshots"},
+            status=400,
+        )
+
+    items = []
+    errors = {}
+    for i, data in enumerate(payload if many else [payload]):
+        serializer = IngestSerializer(data=data)
+        if serializer.is_valid():
+            items.append((uuid.uuid4().hex, serializer.validated_data))
+        elif not many:
+            return JsonResponse(serializer.errors, status=400)
+        else:
+            errors[i] = serializer.errors
+
+    if not ingest_queue.put_many(items):
+        return JsonResponse(
+            {"detail": "Ingest queue is full or stopping"},
+            status=503,
+            headers={"Retry-After": "5"},
+        )
+
+    if not many:
+        return JsonResponse({"id": items[0][0]}, status=202)
+    return JsonResponse(
+        {"ids": [ingest_id for ingest_id, _ in items], "errors": errors},
+        status=202,
+    )
+
 
+# csrf_exempt does not support async views in Django 4.1
+ingest.csrf_exempt = True
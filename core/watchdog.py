@@ -3,6 +3,7 @@ from openchaver.decorators import handle_error, restart_on_exception
 import logging
 import time
 import subprocess
+import psutil
 from openchaver.const import MONITOR_COMMAND, WATCHER_NAME, SERVICE_NAME
 
 def start_service_if_stopped(service_name: str):
@@ -17,72 +18,152 @@ def start_service_if_stopped(service_name: str):
             win32serviceutil.StartService(service_name)
 
 logger = logging.getLogger(__name__)
-if os.name == 'nt':
-    
-    import psutil
-    import win32ts
-    import win32process
-    import win32con
 
-    def monitor_is_running(username: str) -> bool:
-        """Check if the monitor is on"""
+
+class ProcessScanner:
+    """The process queries of the watchdog - psutil, on any platform"""
+
+    def create_time(self, pid: int) -> float | None:
+        """Create time of a running process, None if it is gone"""
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+
+    def find(self, username: str, command: list) -> tuple | None:
+        """(pid, create time) of a process of the user running the command.
+
+        Walks every process on the machine.
+        """
         for proc in psutil.process_iter():
             try:
                 u = proc.username().split('\\')[-1]
-                if u == username:
-                    cmd = proc.cmdline()
-                    if cmd[1:]  == MONITOR_COMMAND[1:]:
-                        return True
+                if u == username and proc.cmdline()[1:] == command[1:]:
+                    return proc.pid, proc.create_time()
             except:  # noqa: E722
                 pass
-        logger.info("Monitor is not running for user %s", username)
-        return False
+        return None
+
+
+class MonitorRegistry:
+    """The monitors of the sessions, as (pid, create time).
+
+    The watchdog registers the monitors it spawns, so checking one is a
+    single process lookup - the create time tells a reused pid apart. A
+    session without a monitor in the registry (the watchdog restarted, or
+    the monitor was started by someone else) falls back to a full scan,
+    and the monitor found is adopted.
+    """
+
+    def __init__(self, scanner: ProcessScanner | None = None, command: list = MONITOR_COMMAND) -> None:
+        self.scanner = scanner or ProcessScanner()
+        self.command = command
+        self.monitors = {}  # session -> (pid, create time)
+        self.checks = 0
+        self.scans = 0
+
+    def register(self, session, pid: int) -> None:
+        """Track a monitor the watchdog spawned"""
+        create_time = self.scanner.create_time(pid)
+        if create_time is not None:
+            self.monitors[session] = (pid, create_time)
+
+    def is_running(self, session, username: str) -> bool:
+        """Check if the monitor of the session is on"""
+        self.checks += 1
+        if session in self.monitors:
+            pid, create_time = self.monitors[session]
+            if self.scanner.create_time(pid) == create_time:
+                return True
+            del self.monitors[session]
+            logger.info("Monitor %s of user %s exited", pid, username)
+            return False
+
+        self.scans += 1
+        found = self.scanner.find(username, self.command)
+        if found is None:
+            logger.info("Monitor is not running for user %s", username)
+            return False
+        self.monitors[session] = found
+        return True
+
+    def forget(self, sessions) -> None:
+        """Drop the monitors of the sessions that are gone"""
+        for session in set(self.monitors) - set(sessions):
+            del self.monitors[session]
+
+    def stats(self) -> dict:
+        return {"monitors": len(self.monitors), "checks": self.checks, "scans": self.scans}
+
+
+monitor_registry = MonitorRegistry()
+
+
+def monitor_is_running(username: str, session=None) -> bool:
+    """Check if the monitor is on"""
+    return monitor_registry.is_running(session if session is not None else username, username)
+
+
+if os.name == 'nt':
+    
+    import win32ts
+    import win32process
+    import win32con
 
     @handle_error
     def keep_monitor_alive(interval: int = 5):
         """Return a list of logged in users"""
         while True:
+            sessions = []
             for session in win32ts.WTSEnumerateSessions(
                     win32ts.WTS_CURRENT_SERVER_HANDLE):
                 id = session['SessionId']
 
                 if id == 0:
                     continue
+                sessions.append(id)
 
                 username = win32ts.WTSQuerySessionInformation(
                     win32ts.WTS_CURRENT_SERVER_HANDLE, id, win32ts.WTSUserName)
 
-                if monitor_is_running(username):
+                if monitor_is_running(username, id):
                     continue
 
                 # Get the token of the logged in user
                 token = win32ts.WTSQueryUserToken(id)
                 command = subprocess.list2cmdline(MONITOR_COMMAND)
-                win32process.CreateProcessAsUser(token, None, command,
-                                                 None, None, False,
-                                                 win32con.CREATE_NO_WINDOW,
-                                                 None, None,
-                                                 win32process.STARTUPINFO())
-                logger.info(f"Started monitor for {username}")
+                process, thread, pid, _ = win32process.CreateProcessAsUser(
+                    token, None, command,
+                    None, None, False,
+                    win32con.CREATE_NO_WINDOW,
+                    None, None,
+                    win32process.STARTUPINFO())
+                process.Close()
+                thread.Close()
+                monitor_registry.register(id, pid)
+                logger.info(f"Started monitor {pid} for {username}")
+            monitor_registry.forget(sessions)
             time.sleep(interval)
 
-    @restart_on_exception
-    @handle_error
-    def keep_watcher_alive():
-        """This function Keeps the OpenChaver Watcher running"""
 
-        logger.info("Starting the OpenChaver Watcher")
-        while True:
-            start_service_if_stopped(WATCHER_NAME)
-            time.sleep(10)
-            
-    @restart_on_exception
-    @handle_error
-    def keep_service_alive():
-        """This function Keeps the OpenChaver Service running"""
+# Windows services - start_service_if_stopped does nothing elsewhere
+@restart_on_exception
+@handle_error
+def keep_watcher_alive():
+    """This function Keeps the OpenChaver Watcher running"""
 
-        logger.info("Starting the OpenChaver Service")
-        while True:
-            start_service_if_stopped(SERVICE_NAME)
-            time.sleep(10)
-    
\ No newline at end of file
+    logger.info("Starting the OpenChaver Watcher")
+    while True:
+        start_service_if_stopped(WATCHER_NAME)
+        time.sleep(10)
+
+
+@restart_on_exception
+@handle_error
+def keep_service_alive():
+    """This function Keeps the OpenChaver Service running"""
+
+    logger.info("Starting the OpenChaver Service")
+    while True:
+        start_service_if_stopped(SERVICE_NAME)
+        time.sleep(10)
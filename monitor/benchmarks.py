@@ -0,0 +1,423 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from core.benchmarks import benchmark, free_port, percentile, start_api
+from core.samples import SAMPLE_SUBJECTS, sample_frames, sample_screenshot
+
+
+@benchmark("transport")
+def bench_transport(uploads=50) -> dict:
+    """Latency and bytes on the wire of the monitor uploads"""
+    import requests
+    from .transport import Transport
+
+    payload = {
+        "title": "Quarterly report final v2.docx - Word",
+        "excutable_name": "WINWORD.EXE",
+        "base64_image": sample_screenshot(),
+        "screenshot_type": "IMAGE",
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        process = start_api("waitress", Path(tmp) / "bench.sqlite3", port)
+        base_url = f"http://127.0.0.1:{port}/api/"
+        try:
+            # The previous implementation - a new connection per upload
+            latencies = []
+            for _ in range(int(uploads)):
+                start = time.perf_counter()
+                requests.post(base_url + "ingest/", json=payload).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            results["requests.post"] = {
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            }
+
+            for compression in ("none", "gzip", "zstd"):
+                transport = Transport(
+                    base_url, COMPRESSION=None if compression == "none" else compression
+                )
+                if compression == "zstd" and transport.compression != "zstd":
+                    # Transport fell back to gzip - that row would be mislabelled
+                    results[compression] = "skipped, zstandard is not installed"
+                    transport.close()
+                    continue
+                for _ in range(int(uploads)):
+                    transport.post("ingest/", payload)
+                results[compression] = transport.stats.as_dict()
+                transport.close()
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+@benchmark("capture")
+def bench_capture(frames=200, width=1920, height=1080, scale=1.25) -> dict:
+    """Frames per second and bytes allocated per frame of the screen capture.
+
+    Grabs the real screen when there is a display, otherwise converts a
+    synthetic BGRA frame (the conversion is what changed).
+    """
+    import tracemalloc
+    import cv2 as cv
+    import numpy as np
+    from .capture import FramePool, ScreenCapture
+
+    frames, width, height, scale = int(frames), int(width), int(height), float(scale)
+    try:
+        capture = ScreenCapture()
+        capture.sct.grab(capture.sct.monitors[1])  # Fails without a display
+        source = "screen"
+
+        def grab():
+            shot = capture.sct.grab(capture.sct.monitors[1])
+            return shot.raw, shot.width, shot.height
+    except Exception:
+        capture = ScreenCapture.__new__(ScreenCapture)
+        capture.bgr = None
+        raw = bytearray(np.random.default_rng(0).integers(0, 255, width * height * 4, dtype=np.uint8))
+        source = "synthetic"
+
+        def grab():
+            return raw, width, height
+
+    def previous(pool):
+        # The previous implementation - copy, slice and resize allocate
+        raw, w, h = grab()
+        image = np.array(np.frombuffer(raw, dtype=np.uint8).reshape(h, w, 4))[:, :, :3]
+        if scale != 1.0:
+            image = cv.resize(image, None, fx=scale, fy=scale)
+        return image
+
+    def reusable(pool):
+        raw, w, h = grab()
+        image = capture.convert(raw, w, h, scale, pool)
+        pool.release(image)
+        return image
+
+    results = {"source": source}
+    for name, f in (("previous", previous), ("reusable", reusable)):
+        pool = FramePool()
+        f(pool)  # Warm up - the first frame allocates the buffers
+        start = time.perf_counter()
+        for _ in range(frames):
+            f(pool)
+        elapsed = time.perf_counter() - start
+
+        # Bytes a frame allocates on top of what is already held
+        allocated = 0
+        tracemalloc.start()
+        for _ in range(20):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            f(pool)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+        results[name] = {
+            "frames/s": round(frames / elapsed, 1),
+            "ms/frame": round(elapsed / frames * 1000, 2),
+            "bytes/frame": allocated // 20,
+        }
+    return results
+
+
+@benchmark("debounce")
+def bench_debounce(polls=100000, stable=5.0) -> dict:
+    """Cost of a window debouncer poll and the delay of its change events"""
+    import random
+    from types import SimpleNamespace
+    from .debounce import WindowDebouncer
+
+    rng = random.Random(0)
+    now = 0.0
+    # Foreground windows with random dwell times, one poll per second
+    schedule = []
+    while len(schedule) < int(polls):
+        title = rng.choice(SAMPLE_SUBJECTS)
+        schedule += [SimpleNamespace(title=title)] * rng.randint(1, 30)
+    schedule = schedule[: int(polls)]
+    position = 0
+
+    def source():
+        return schedule[position]
+
+    debouncer = WindowDebouncer(source, stable=float(stable), clock=lambda: now)
+    delays = []
+    changed_at = 0.0
+    start = time.perf_counter()
+    for position in range(len(schedule)):
+        now = float(position)
+        if position and schedule[position].title != schedule[position - 1].title:
+            changed_at = now
+        if debouncer.poll() is not None:
+            delays.append(now - changed_at)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "polls/s": round(len(schedule) / elapsed, 1),
+        "us/poll": round(elapsed / len(schedule) * 1e6, 3),
+        "events": debouncer.changes,
+        # Every event comes exactly `stable` seconds after the change
+        "min_delay_s": min(delays),
+        "max_delay_s": max(delays),
+    }
+
+
+@benchmark("monitor")
+def bench_monitor(
+    duration=10.0,
+    meta_interval=0.05,
+    image_interval=0.2,
+    nsfw_interval=0.5,
+    encoders=2,
+) -> dict:
+    """The monitor end-to-end on the synthetic window backend, as fast as it goes"""
+    from django.test import override_settings
+    from .monitor_windows import WindowMonitor
+
+    with tempfile.TemporaryDirectory() as tmp, override_settings(
+        SPOOL={**settings.SPOOL, "PATH": Path(tmp) / "spool.sqlite3"},
+        MONITOR={**settings.MONITOR, "BACKEND": "synthetic"},
+    ):
+        monitor = WindowMonitor(
+            meta_interval=float(meta_interval),
+            image_interval=float(image_interval),
+            nsfw_interval=float(nsfw_interval),
+            stable=0,
+            encoders=int(encoders),
+            adaptive=False,  # Fixed intervals - measure the pipeline, not the scheduler
+        )
+        monitor.pipeline.start()
+        ticks = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < float(duration):
+            tick = time.perf_counter()
+            monitor.screenshoot()
+            monitor.pipeline.capture.record(time.perf_counter() - tick)
+            ticks += 1
+        monitor.pipeline.encode_queue.join()
+        elapsed = time.perf_counter() - start
+        stats = monitor.pipeline.stats()
+        monitor.pipeline.stop()
+
+        return {"ticks/s": round(ticks / elapsed, 1), **stats}
+
+
+@benchmark("scheduler")
+def bench_scheduler(trace=None, hours=8.0, seed=0) -> dict:
+    """Captures and NSFW detection latency of the fixed vs adaptive schedule
+    replayed over an activity trace (JSON lines, or a generated day)"""
+    from .scheduler import CaptureScheduler, generate_trace, read_trace, simulate
+
+    events = read_trace(trace) if trace else generate_trace(float(hours), int(seed))
+    return {
+        "trace_events": len(events),
+        "fixed": simulate(events, CaptureScheduler(adaptive=False)),
+        "adaptive": simulate(events, CaptureScheduler()),
+    }
+
+
+@benchmark("prefilter")
+def bench_prefilter(frames=200, corpus=None, models=0, seed=0) -> dict:
+    """CPU and bytes the monitor NSFW prefilter saves, and how often it
+    disagrees with the server.
+
+    The server is compared at two stages: its skin check - the one the
+    gate approximates - and the end of the pipeline, get_bounding_boxes
+    (frames without images in them are never NSFW) or the NSFW models
+    with models=1.
+    """
+    import cv2 as cv
+    from core.image_utils import contains_skin, encode_numpy_to_base64, get_bounding_boxes
+    from .prefilter import SERVER_SKIN_THRESH, SkinGate
+
+    if corpus:
+        images = [cv.imread(str(f)) for f in sorted(Path(corpus).iterdir())
+                  if f.suffix.lower() in (".png", ".jpg", ".jpeg")]
+    else:
+        images = sample_frames(int(frames), int(seed))
+
+    gate = SkinGate()
+    encode_s = server_s = 0.0
+    sent_bytes = total_bytes = 0
+    skin = flagged = 0
+    disagree = {"safe_but_skin": 0, "safe_but_flagged": 0, "sent_but_no_skin": 0, "sent_but_clear": 0}
+    for image in images:
+        start = time.perf_counter()
+        encoded = encode_numpy_to_base64(image)
+        encode_s += time.perf_counter() - start
+        total_bytes += len(encoded)
+
+        start = time.perf_counter()
+        has_skin = bool(contains_skin(image, thresh=SERVER_SKIN_THRESH))
+        candidate = has_skin and bool(get_bounding_boxes(image))
+        server_s += time.perf_counter() - start
+        if candidate and int(models):
+            from core.models import Screenshot
+            candidate = Screenshot(base64_image=encoded).detect_nsfw()[0]
+        skin += has_skin
+        flagged += candidate
+
+        safe = gate.is_safe(image)
+        if not safe:
+            sent_bytes += len(encoded)
+        disagree["safe_but_skin"] += safe and has_skin
+        # Frames the gate keeps back but the server flags - must be 0
+        disagree["safe_but_flagged"] += safe and candidate
+        disagree["sent_but_no_skin"] += not safe and not has_skin
+        # Frames uploaded for nothing - the savings left on the table
+        disagree["sent_but_clear"] += not safe and not candidate
+
+    count = len(images)
+    gate_stats = gate.stats()
+    return {
+        "frames": count,
+        "server_skin": skin,
+        "server_flagged": flagged,
+        "gate_safe": gate_stats["safe"],
+        "disagree": disagree,
+        "disagree_rate_skin": round((disagree["safe_but_skin"] + disagree["sent_but_no_skin"]) / count, 4),
+        "disagree_rate_flagged": round((disagree["safe_but_flagged"] + disagree["sent_but_clear"]) / count, 4),
+        "gate_ms/frame": gate_stats["ms/check"],
+        "encode_ms/frame": round(encode_s / count * 1000, 2),
+        "server_ms/frame": round(server_s / count * 1000, 2),
+        # Encoding of the frames sent plus the gate on all, against encoding all
+        "monitor_cpu_saved": round(1 - (gate.seconds + encode_s * sent_bytes / total_bytes) / encode_s, 3),
+        "bytes_without_gate": total_bytes,
+        "bytes_with_gate": sent_bytes,
+        "bytes_saved": round(1 - sent_bytes / total_bytes, 3),
+    }
+
+
+@benchmark("dedupe")
+def bench_dedupe(captures=300, seed=0) -> dict:
+    """Frames the monitor deduplication suppresses and the changes it misses.
+
+    Replays captures of a few windows: the same frame again, a blinking
+    cursor, a changed line of text or another window. A frame is identical
+    when it is pixel for pixel the frame last uploaded for its window.
+    """
+    import cv2 as cv
+    import numpy as np
+    import random
+    from core.image_utils import decode_base64_to_numpy, encode_numpy_to_base64
+    from .dedupe import FrameDeduplicator
+
+    rng = random.Random(int(seed))
+    windows = [decode_base64_to_numpy(sample_screenshot(seed=n)) for n in range(8)]
+    dedupe = FrameDeduplicator()
+    uploaded = {}  # window -> last frame uploaded
+    counts = {}
+    identical = suppressed_identical = 0
+    missed = []  # Pixels changed in the changed frames suppressed
+    hash_s = encode_s = 0.0
+    sent_bytes = total_bytes = 0
+    window = 0
+    frame = windows[window].copy()
+    for _ in range(int(captures)):
+        kind = rng.choices(["same", "cursor", "text", "switch"], [0.6, 0.1, 0.1, 0.2])[0]
+        if kind == "switch":
+            window = (window + rng.randint(1, len(windows) - 1)) % len(windows)
+            frame = windows[window].copy()
+        elif kind == "cursor":
+            x, y = rng.randint(240, 1200), rng.randint(60, 700)
+            frame[y:y + 16, x:x + 2] = 255 - frame[y:y + 16, x:x + 2]
+        elif kind == "text":
+            y = rng.randrange(70, 700, 24)
+            frame[y - 14:y + 6, 240:] = 245
+            text = " ".join(rng.choice(SAMPLE_SUBJECTS) for _ in range(3))
+            cv.putText(frame, text, (240, y), cv.FONT_HERSHEY_SIMPLEX, 0.5, (20, 20, 20), 1)
+        counts[kind] = counts.get(kind, 0) + 1
+
+        start = time.perf_counter()
+        _, unchanged = dedupe.check(f"Window {window}", frame)
+        hash_s += time.perf_counter() - start
+        start = time.perf_counter()
+        size = len(encode_numpy_to_base64(frame))
+        encode_s += time.perf_counter() - start
+        total_bytes += size
+
+        same = window in uploaded and np.array_equal(uploaded[window], frame)
+        identical += same
+        if unchanged and same:
+            suppressed_identical += 1
+        elif unchanged:
+            missed.append(int(np.count_nonzero((uploaded[window] != frame).any(axis=2))))
+        else:
+            uploaded[window] = frame.copy()
+            sent_bytes += size
+
+    count = int(captures)
+    return {
+        "captures": counts,
+        "identical": identical,
+        "suppressed_identical": suppressed_identical,
+        # Changed frames taken as unchanged - blinking cursors at most
+        "suppressed_changed": len(missed),
+        "suppressed_max_pixels": max(missed, default=0),
+        "hash_ms/frame": round(hash_s / count * 1000, 2),
+        "encode_ms/frame": round(encode_s / count * 1000, 2),
+        "monitor_cpu_saved": round(1 - (hash_s + encode_s * sent_bytes / total_bytes) / encode_s, 3),
+        "bytes_saved": round(1 - sent_bytes / total_bytes, 3),
+    }
+
+
+@benchmark("procinfo")
+def bench_procinfo(polls=20000, processes=8, dwell=30) -> dict:
+    """Cost of the executable name and DPI lookups of the foreground window,
+    with and without the caches.
+
+    Replays one poll per second over the running processes: every process
+    is in the foreground for ~dwell seconds, like a window. The DPI lookup
+    stands in for GetDpiForWindow.
+    """
+    import random
+    import psutil
+    from .procinfo import DpiCache, ProcessCache
+
+    rng = random.Random(0)
+    pids = [p.pid for p in psutil.process_iter() if p.pid != 0][: int(processes)]
+    schedule = []
+    while len(schedule) < int(polls):
+        schedule += [rng.choice(pids)] * rng.randint(1, 2 * int(dwell))
+    schedule = schedule[: int(polls)]
+
+    now = 0.0
+    cache = ProcessCache(clock=lambda: now)
+    dpi = DpiCache(clock=lambda: now)
+    os_calls = 0
+
+    def get_dpi(window):
+        nonlocal os_calls
+        os_calls += 1
+        return 96
+
+    def uncached(pid):
+        psutil.Process(pid).name()
+        get_dpi(pid)
+
+    def cached(pid):
+        cache.name(pid)
+        dpi.get(pid, get_dpi)
+
+    results = {"processes": len(pids)}
+    for name, lookup in (("uncached", uncached), ("cached", cached)):
+        os_calls = 0
+        start = time.perf_counter()
+        for n, pid in enumerate(schedule):
+            now = float(n)
+            try:
+                lookup(pid)
+            except psutil.Error:
+                pass
+        elapsed = time.perf_counter() - start
+        results[name] = {"us/poll": round(elapsed / len(schedule) * 1e6, 2), "dpi_calls": os_calls}
+    results["process_cache"] = cache.stats()
+    results["dpi_cache"] = dpi.stats()
+    return results
@@ -0,0 +1,119 @@
+# cv2, numpy and mss are imported on first use
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FramePool:
+    """Reusable frame buffers.
+
+    The frames are handed to the encoder threads, so a buffer can only be
+    reused once it is released. Buffers are allocated on demand.
+
+    The frame size follows the size of the window, so only the buffers of
+    the max_shapes most recently released shapes are kept - those of the
+    other shapes are dropped. For every shape kept there are at most as
+    many buffers as there were frames in flight.
+    """
+
+    def __init__(self, max_shapes: int = 2) -> None:
+        self.max_shapes = max_shapes
+        self.free = OrderedDict()  # shape -> buffers, least recently released first
+        self.lock = threading.Lock()
+        self.allocated = 0
+        self.dropped = 0
+
+    def acquire(self, shape: tuple) -> np.ndarray:
+        with self.lock:
+            buffers = self.free.get(shape)
+            if buffers:
+                return buffers.pop()
+            self.allocated += 1
+        import numpy as np
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, frame: np.ndarray) -> None:
+        with self.lock:
+            self.free.setdefault(frame.shape, []).append(frame)
+            self.free.move_to_end(frame.shape)
+            while len(self.free) > self.max_shapes:
+                _, buffers = self.free.popitem(last=False)
+                self.dropped += len(buffers)
+
+    def nbytes(self) -> int:
+        """Size of the free buffers"""
+        with self.lock:
+            return sum(frame.nbytes for buffers in self.free.values() for frame in buffers)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.free.clear()
+
+
+class ScreenCapture:
+    """A long-lived mss instance with its conversion buffers.
+
+    mss keeps display handles per instance and they can not be shared
+    between threads - use get_capture() for the instance of this thread.
+    """
+
+    def __init__(self) -> None:
+        import mss
+
+        self.sct = mss.mss()
+        self.bgr = None  # Scratch buffer before scaling
+
+    def grab(self, coordinates: tuple, scale: float = 1.0, pool: FramePool | None = None) -> np.ndarray:
+        """Grab a region of the screen as a BGR image"""
+        shot = self.sct.grab(coordinates)
+        return self.convert(shot.raw, shot.width, shot.height, scale, pool)
+
+    def convert(self, raw, width: int, height: int, scale: float = 1.0, pool: FramePool | None = None) -> np.ndarray:
+        """BGRA pixels -> BGR image, scaled by scale.
+
+        The pixels are wrapped without a copy, the alpha channel is dropped
+        and the image scaled into reused buffers. The result comes from the
+        pool if one is given - release it when done with it.
+        """
+        import cv2 as cv
+        import numpy as np
+
+        bgra = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+        if scale != 1.0:
+            size = (round(width * scale), round(height * scale))
+            shape = (size[1], size[0], 3)
+        else:
+            shape = (height, width, 3)
+        out = pool.acquire(shape) if pool else np.empty(shape, dtype=np.uint8)
+
+        if scale == 1.0:
+            cv.cvtColor(bgra, cv.COLOR_BGRA2BGR, dst=out)
+            return out
+
+        if self.bgr is None or self.bgr.shape != (height, width, 3):
+            self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+        cv.cvtColor(bgra, cv.COLOR_BGRA2BGR, dst=self.bgr)
+        cv.resize(self.bgr, size, dst=out)
+        return out
+
+    def close(self) -> None:
+        self.sct.close()
+
+
+_local = threading.local()
+
+
+def get_capture() -> ScreenCapture:
+    """The ScreenCapture of the calling thread"""
+    if not hasattr(_local, "capture"):
+        logger.debug(f"Opening a screen capture for {threading.current_thread().name}")
+        _local.capture = ScreenCapture()
+    return _local.capture
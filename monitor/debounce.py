@@ -0,0 +1,66 @@
+import logging
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class WindowDebouncer:
+    """Non-blocking window stability check.
+
+    Every poll samples the foreground window once from the source. A window
+    is stable once it has been in the foreground for `stable` seconds; the
+    poll that sees it become stable returns it (the change event). Nothing
+    sleeps, so the caller keeps its own schedule.
+
+    The source is any callable returning the foreground window - an object
+    with a title - or None when there is none. Windows are compared by
+    title, like the previous stable_check.
+    """
+
+    def __init__(
+        self,
+        source: Callable,
+        stable: float = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.source = source
+        self.stable = stable
+        self.clock = clock
+        self.candidate = None  # The foreground window, maybe not stable yet
+        self.first_seen = 0.0  # When the candidate came to the foreground
+        self.window = None  # The stable window or None while settling
+        self.samples = 0
+        self.changes = 0
+
+    def poll(self):
+        """Sample the foreground window, returns it when it became stable"""
+        now = self.clock()
+        window = self.source()
+        self.samples += 1
+
+        if window is None:
+            self.candidate = self.window = None
+            return None
+
+        if self.candidate is None or window.title != self.candidate.title:
+            # A new window - start its timer
+            self.candidate = window
+            self.first_seen = now
+            self.window = None
+
+        if self.window is None and now - self.first_seen >= self.stable:
+            self.window = window
+            self.changes += 1
+            logger.debug(f"Stable window: {window.title}")
+            return window
+        if self.window is not None:
+            self.window = window  # Same title, the freshest handle
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "changes": self.changes,
+            "settling": self.candidate is not None and self.window is None,
+        }
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# The server keeps the image of these whatever their verdict - only they
+# can be referred to by unchanged frames
+REFERENCE_TYPES = ("IMAGE", "NSFW_IMAGE")
+
+
+def frame_hash(image: np.ndarray, size: int = 32) -> np.ndarray:
+    """Difference hash of a frame - size * size bits, one per pair of
+    neighbouring cells of the downscaled grayscale frame"""
+    import cv2 as cv
+    import numpy as np
+
+    gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    small = cv.resize(gray, (size + 1, size), interpolation=cv.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+def hash_distance(a: np.ndarray, b: np.ndarray) -> int:
+    """Number of differing bits"""
+    import numpy as np
+
+    return int(np.count_nonzero(np.unpackbits(np.bitwise_xor(a, b))))
+
+
+class FrameDeduplicator:
+    """Remembers the hash of the last frame uploaded for every window.
+
+    A frame within max_distance bits of it is unchanged: the event goes up
+    with unchanged_since set to the id of that frame instead of the image,
+    and the server takes the verdict of that frame. After max_age seconds
+    a full frame is uploaded again, so the frames referred to are recent.
+
+    Only the frames of REFERENCE_TYPES are remembered. The server deletes
+    the NSFW frames and drops the image of the NSFW_META frames found
+    safe, so an archived frame referring to one of them would end up
+    without an image.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 2,
+        max_age: float = 600,
+        max_windows: int = 256,
+        clock=time.monotonic,
+    ) -> None:
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.max_windows = max_windows
+        self.clock = clock
+        self.frames = OrderedDict()  # title -> (hash, frame id, time)
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.unchanged = 0
+
+    def check(self, title: str, image: np.ndarray, reference: bool = True) -> tuple[str | None, bool]:
+        """(frame id, unchanged) - the id of the unchanged frame, or a new
+        id for this frame to upload with if it is a reference (None if not)"""
+        digest = frame_hash(image)
+        now = self.clock()
+        with self.lock:
+            self.checked += 1
+            last = self.frames.get(title)
+            if (
+                last is not None
+                and now - last[2] < self.max_age
+                and hash_distance(digest, last[0]) <= self.max_distance
+            ):
+                self.frames.move_to_end(title)
+                self.unchanged += 1
+                return last[1], True
+            if not reference:
+                return None, False
+
+            frame_id = uuid.uuid4().hex
+            self.frames[title] = (digest, frame_id, now)
+            self.frames.move_to_end(title)
+            while len(self.frames) > self.max_windows:
+                self.frames.popitem(last=False)
+            return frame_id, False
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "checked": self.checked,
+                "unchanged": self.unchanged,
+                "windows": len(self.frames),
+            }
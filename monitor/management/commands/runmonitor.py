@@ -1,21 +1,48 @@
 # Custom command to run the monitor
 # Path: monitor\management\commands\monitor.py
 
-from django.core.management.base import BaseCommand
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
 from monitor.monitor_windows import run_monitor
-from openchaver.utils import thread_runner
+from monitor.spool import run_flusher
+from monitor.window import BACKENDS, get_window_class
+from openchaver.supervisor import Supervisor
 
 class Command(BaseCommand):
     help = "Run the monitor"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            choices=BACKENDS,
+            default=None,
+            help="Window backend (default: settings.MONITOR['BACKEND'])",
+        )
+
     def handle(self, *args, **options):
+        # Fail here - the supervisor would restart the monitor forever
+        try:
+            get_window_class(options["backend"])
+        except (ValueError, ImportError) as e:
+            raise CommandError(f"Unable to start the monitor: {e}")
+
+        stopping = threading.Event()
         services = {
-            # Monitor
+            # Monitor - the frames captured are spooled on shutdown
             "Monitor": {
                 "target": run_monitor,
                 "args": (),
+                "kwargs": {"backend": options["backend"], "stopping": stopping},
+                "daemon": True,
+                "stop": stopping.set,
+            },
+            # Upload the spooled screenshots
+            "Flusher": {
+                "target": run_flusher,
+                "args": (),
                 "kwargs": {},
                 "daemon": True,
             },
         }
-        thread_runner(services)
\ No newline at end of file
+        Supervisor(services).run()
\ No newline at end of file
@@ -1,10 +1,15 @@
 import time
-import requests
 import logging
+import threading
+import psutil
+from django.utils import timezone
 from openchaver.decorators import handle_error
-from .afk import seconds_since_last_input
-from .window import Window, UnstableWindow, NoWindowFound
-from openchaver.const import PORT
+from .debounce import WindowDebouncer
+from .dedupe import FrameDeduplicator
+from .pipeline import Pipeline
+from .prefilter import SkinGate
+from .scheduler import CaptureScheduler
+from .window import NoWindowFound, UnstableWindow, WindowBase, get_window_class
 logger = logging.getLogger(__name__)
 
 
@@ -17,6 +22,18 @@ class WindowMonitor:
         nsfw_interval=10,
         stable=5,
         away=60,
+        encoders=2,
+        encode_queue=4,
+        stats_interval=300,
+        backend=None,
+        max_backoff=8,
+        cpu_threshold=80,
+        cpu_stretch=3,
+        max_images_per_minute=12,
+        adaptive=True,
+        prefilter=True,
+        dedupe=True,
+        stopping: threading.Event | None = None,
     ) -> None:
         self.sleep_interval = sleep_interval
         self.meta_interval = meta_interval
@@ -24,74 +41,83 @@ class WindowMonitor:
         self.nsfw_interval = nsfw_interval
         self.stable = stable
         self.away = away
-        self.window = Window.get_active_window()
-        self.meta_timer = time.time()
-        self.image_timer = time.time()
-        self.nsfw_timer = time.time()
+        self.Window = get_window_class(backend)
+        self.window = self.Window.get_active_window()
+        self.scheduler = CaptureScheduler(
+            meta_interval=meta_interval,
+            image_interval=image_interval,
+            nsfw_interval=nsfw_interval,
+            max_backoff=max_backoff,
+            cpu_threshold=cpu_threshold,
+            cpu_stretch=cpu_stretch,
+            max_images_per_minute=max_images_per_minute,
+            adaptive=adaptive,
+        )
+        self.stats_interval = stats_interval
+        self.stats_timer = time.time()
+        self.pipeline = Pipeline(
+            encoders=encoders,
+            queue_size=encode_queue,
+            prefilter=SkinGate() if prefilter else None,
+            dedupe=FrameDeduplicator() if dedupe else None,
+        )
+        self.debouncer = WindowDebouncer(self.active_window, stable=stable)
+        self.stopping = stopping or threading.Event()  # Set to make run() return
+
+    def active_window(self) -> WindowBase | None:
+        """The foreground window, sampled once - no stability wait"""
+        try:
+            return self.Window.get_active_window(invalid_title=self.window.title)
+        except NoWindowFound:
+            return None
 
     @handle_error
-    def upload_screenshot(self, window: Window, screenshot_type="META"):
-        """Upload the screenshot to the server"""
+    def upload_screenshot(self, window: WindowBase, screenshot_type="META"):
+        """Grab the screenshot and hand it to the pipeline - the encoders
+        and the flusher upload it to the server"""
         data = {
             "title": window.title,
             "excutable_name": window.exec_name,
-            "base64_image": window.take_screenshot()
-            if screenshot_type in ["IMAGE", "NSFW", "NSFW_IMAGE", "NSFW_META"]
-            else None,
+            "base64_image": None,
             "screenshot_type": screenshot_type,
+            "timestamp": timezone.now().isoformat(),
         }
-        response = requests.post(
-            f"http://localhost:{PORT}/api/screenshots/", json=data
-        )
-        response.raise_for_status()
+        image = None
+        if screenshot_type in ["IMAGE", "NSFW", "NSFW_IMAGE", "NSFW_META"]:
+            image = window.grab(self.pipeline.frames)
+        self.pipeline.submit(data, image)
+
+    def log_stats(self) -> None:
+        """Log the depth, drops and timings of the pipeline stages"""
+        if time.time() - self.stats_timer > self.stats_interval:
+            self.stats_timer = time.time()
+            logger.info(
+                f"Pipeline stats: {self.pipeline.stats()} "
+                f"windows: {self.debouncer.stats()} "
+                f"caches: {self.Window.cache_stats()}"
+            )
 
 
 
     def screenshoot(
         self,
     ) -> None:
-        """Take a screenshot of the window"""
-        meta = False
-        image = False
-        nsfw = False
-
-        # Get the active window
+        """Take a screenshot of the window if the scheduler says so"""
+        # Get the active window once it has been stable for self.stable seconds
         try:
-            window = Window.get_active_window(
-                invalid_title=self.window.title, stable=self.stable
+            changed = self.debouncer.poll() is not None
+            window = self.debouncer.window
+            if window is None:
+                return
+
+            screenshot_type = self.scheduler.decide(
+                time.monotonic(),
+                changed=changed,
+                afk=self.is_afk(),
+                cpu=psutil.cpu_percent(interval=None),
             )
-            # If meta interval has passed
-            if time.time() - self.meta_timer > self.meta_interval:
-                meta = True
-                self.meta_timer = time.time()
-
-            # If image interval has passed
-            if time.time() - self.image_timer > self.image_interval:
-                image = True
-                self.image_timer = time.time()
-
-            # If nsfw interval has passed
-            if time.time() - self.nsfw_timer > self.nsfw_interval:
-                nsfw = True
-                self.nsfw_timer = time.time()
-
-            if image and nsfw:  # Keep image - scan nsfw
-                self.upload_screenshot(window, screenshot_type="NSFW_IMAGE")
-
-            elif meta and image:  # Keep image - dont scan nsfw
-                self.upload_screenshot(window, screenshot_type="IMAGE")
-
-            elif meta and nsfw:  # Dont keep image - scan nsfw
-                self.upload_screenshot(window, screenshot_type="NSFW_META")
-
-            elif meta:  # Dont keep image - dont scan nsfw
-                self.upload_screenshot(window, screenshot_type="META")
-
-            elif image:  # Keep image - dont scan nsfw
-                self.upload_screenshot(window, screenshot_type="IMAGE")
-
-            elif nsfw:  # Dont keep image - scan nsfw
-                self.upload_screenshot(window, screenshot_type="NSFW")
+            if screenshot_type:
+                self.upload_screenshot(window, screenshot_type=screenshot_type)
 
         except (UnstableWindow, NoWindowFound):
             pass
@@ -100,7 +126,7 @@ class WindowMonitor:
 
     def is_afk(self) -> bool:
         """Check if the user is afk"""
-        return seconds_since_last_input() > self.away
+        return self.Window.seconds_since_last_input() > self.away
 
     @handle_error
     def run(
@@ -110,16 +136,36 @@ class WindowMonitor:
         Run the monitor
         """
 
-        while True:
-            time.sleep(self.sleep_interval / 2)
-
+        self.pipeline.start()
+        try:
+            self.loop()
+        finally:
+            # Stopped, or restarted with a new pipeline - the frames queued
+            # are encoded and spooled, then the encoders of this one return
+            self.pipeline.stop()
+
+    def loop(self) -> None:
+        # Fixed rate - the next tick does not drift by the cost of this one
+        next_tick = time.monotonic()
+        while not self.stopping.is_set():
             # Screenshoot if not afk
             if not self.is_afk():
+                start = time.perf_counter()
                 self.screenshoot()
-
-            time.sleep(self.sleep_interval / 2)
-
-def run_monitor():
-    """Run the monitor"""
-    monitor = WindowMonitor()
+                self.pipeline.capture.record(time.perf_counter() - start)
+            self.log_stats()
+
+            next_tick += self.sleep_interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self.stopping.wait(delay)
+            else:
+                # Behind schedule - skip the missed ticks instead of bursting
+                with self.pipeline.capture.lock:
+                    self.pipeline.capture.late += 1
+                next_tick = time.monotonic()
+
+def run_monitor(backend=None, stopping: threading.Event | None = None):
+    """Run the monitor until stopping is set"""
+    monitor = WindowMonitor(backend=backend, stopping=stopping)
     monitor.run()
\ No newline at end of file
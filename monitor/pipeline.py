@@ -0,0 +1,207 @@
+import logging
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+
+from core.image_utils import encode_numpy_to_base64
+from .capture import FramePool
+from .dedupe import REFERENCE_TYPES, FrameDeduplicator
+from .prefilter import PREFILTER_TYPES, SkinGate
+from .spool import Spool
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Throughput, drops and timings of a pipeline stage"""
+
+    def __init__(self, name: str, queue: queue.Queue | None = None, window: int = 500) -> None:
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.dropped = 0
+        self.late = 0  # Capture ticks that started behind schedule
+        self.timings = deque(maxlen=window)  # Seconds, the last items only
+        self.bytes = 0  # Output of the stage
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, size: int = 0) -> None:
+        with self.lock:
+            self.processed += 1
+            self.timings.append(seconds)
+            self.bytes += size
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            timings = list(self.timings)
+            stats = {
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "late": self.late,
+            }
+            if self.bytes:
+                stats["bytes"] = self.bytes
+        if self.queue is not None:
+            stats["depth"] = self.queue.qsize()
+        if len(timings) > 1:
+            q = statistics.quantiles(timings, n=100)
+            stats.update(p50_ms=round(q[49] * 1000, 1), p95_ms=round(q[94] * 1000, 1))
+        return stats
+
+
+class Pipeline:
+    """capture -> encode -> spool -> upload
+
+    The capture thread only grabs pixels and hands them over, so it keeps
+    its schedule. A pool of encoder threads does the PNG and base64
+    encoding (cv.imencode releases the GIL) and spools the event; the
+    Flusher uploads the spool in batches.
+
+    Backpressure: the encode queue is bounded. When it is full the oldest
+    frame waiting there is dropped - the newest capture is the one worth
+    keeping. Events without an image skip the encoders and are never
+    dropped here (the spool bounds them).
+
+    With a prefilter the encoders check the NSFW and NSFW_META frames
+    first. The safe ones are not encoded: NSFW_META goes up as META and
+    NSFW not at all - what the server would keep of them.
+
+    With a deduplicator a frame unchanged since the last archived frame of
+    its window is not encoded either: the event refers to that frame.
+    """
+
+    def __init__(
+        self,
+        encoders: int = 2,
+        queue_size: int = 4,
+        prefilter: SkinGate | None = None,
+        dedupe: FrameDeduplicator | None = None,
+    ) -> None:
+        self.encoders = encoders
+        self.prefilter = prefilter
+        self.dedupe = dedupe
+        self.encode_queue = queue.Queue(maxsize=queue_size)
+        self.capture = StageStats("capture")
+        self.encode = StageStats("encode", self.encode_queue)
+        self.frames = FramePool()  # Frame buffers, released once encoded
+        self.threads = []
+        self.spools = threading.local()  # SQLite connections are per thread
+
+    @property
+    def spool(self) -> Spool:
+        if not hasattr(self.spools, "spool"):
+            self.spools.spool = Spool()
+        return self.spools.spool
+
+    def start(self) -> None:
+        """Start the encoder threads if they are not running"""
+        self.threads = [t for t in self.threads if t.is_alive()]
+        for _ in range(self.encoders - len(self.threads)):
+            thread = threading.Thread(target=self.encoder, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self) -> None:
+        """Make the encoders return once the frames queued before are
+        encoded and wait for them. Called from the capture thread - its
+        spool connection is closed too."""
+        threads, self.threads = self.threads, []
+        for _ in threads:
+            self.encode_queue.put(None)
+        for thread in threads:
+            thread.join()
+        if hasattr(self.spools, "spool"):
+            self.spools.spool.close()
+            del self.spools.spool
+
+    def submit(self, data: dict, image=None) -> None:
+        """Hand an event over from the capture thread, never blocks"""
+        if image is None:
+            self.spool.put(data)
+            return
+
+        while True:
+            try:
+                self.encode_queue.put_nowait((data, image))
+                return
+            except queue.Full:
+                pass
+            try:
+                dropped, frame = self.encode_queue.get_nowait()
+                self.encode_queue.task_done()
+            except queue.Empty:
+                continue
+            self.frames.release(frame)
+            with self.encode.lock:
+                self.encode.dropped += 1
+            logger.warning(f"Encoders are behind - dropped the frame of {dropped['title']}")
+
+    def encoder(self) -> None:
+        while True:
+            item = self.encode_queue.get()
+            if item is None:
+                # Stopped - the spool connection belongs to this thread
+                self.encode_queue.task_done()
+                if hasattr(self.spools, "spool"):
+                    self.spools.spool.close()
+                    del self.spools.spool
+                return
+            data, image = item
+            try:
+                if (
+                    self.prefilter is not None
+                    and data["screenshot_type"] in PREFILTER_TYPES
+                    and self.prefilter.is_safe(image)
+                ):
+                    if data["screenshot_type"] == "NSFW_META":
+                        data["screenshot_type"] = "META"
+                        self.spool.put(data)
+                    continue
+
+                if self.dedupe is not None:
+                    frame_id, unchanged = self.dedupe.check(
+                        data["title"], image, data["screenshot_type"] in REFERENCE_TYPES
+                    )
+                    if unchanged:
+                        data["unchanged_since"] = frame_id
+                        self.spool.put(data)
+                        continue
+                    if frame_id:
+                        data["frame_id"] = frame_id
+
+                start = time.perf_counter()
+                data["base64_image"] = encode_numpy_to_base64(image)
+                self.spool.put(data)
+                self.encode.record(time.perf_counter() - start, len(data["base64_image"]))
+            except:  # noqa: E722
+                logger.exception(f"Unable to encode the frame of {data['title']}")
+            finally:
+                self.frames.release(image)
+                self.encode_queue.task_done()
+
+    def savings(self, frames: int) -> dict:
+        """The encoding and upload of `frames` frames saved, estimated from
+        the average frame"""
+        encode = self.encode.as_dict()
+        saved = {}
+        if encode["processed"]:
+            saved["saved_bytes"] = frames * encode.get("bytes", 0) // encode["processed"]
+        if "p50_ms" in encode:
+            saved["saved_encode_ms"] = round(frames * encode["p50_ms"], 1)
+        return saved
+
+    def stats(self) -> dict:
+        stats = {
+            "capture": self.capture.as_dict(),
+            "encode": self.encode.as_dict(),
+            "spool": self.spool.stats(),
+        }
+        if self.prefilter is not None:
+            prefilter = self.prefilter.stats()
+            stats["prefilter"] = {**prefilter, **self.savings(prefilter["safe"])}
+        if self.dedupe is not None:
+            dedupe = self.dedupe.stats()
+            stats["dedupe"] = {**dedupe, **self.savings(dedupe["unchanged"])}
+        return stats
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from core.image_utils import color_in_image, create_thumbnail, raw_skin_ratio
+
+logger = logging.getLogger(__name__)
+
+# The server keeps the image of these only if it is NSFW
+PREFILTER_TYPES = ("NSFW", "NSFW_META")
+
+# get_bounding_boxes skips the frames below this skin ratio
+SERVER_SKIN_THRESH = 0.5
+
+
+class SkinGate:
+    """Cheap local check of the NSFW and NSFW_META captures.
+
+    The server runs its models only on frames with skin colored pixels -
+    get_bounding_boxes drops the others right away and the image is thrown
+    away. The gate runs the same check on a thumbnail, so those frames are
+    neither encoded nor uploaded.
+
+    It errs on the side of uploading: the skin pixels are counted before
+    the noise removal (which only removes pixels) and compared with
+    `margin` times the server threshold. Black and white frames are always
+    uploaded, like the server treats them as skin.
+    """
+
+    def __init__(self, max_side: int = 256, margin: float = 0.5) -> None:
+        self.max_side = max_side
+        self.thresh = SERVER_SKIN_THRESH * margin
+        self.checked = 0
+        self.safe = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def is_safe(self, image: np.ndarray) -> bool:
+        """True when the frame can not be NSFW on the server"""
+        start = time.perf_counter()
+        thumbnail = create_thumbnail(image, self.max_side)
+        safe = bool(color_in_image(thumbnail) and raw_skin_ratio(thumbnail) <= self.thresh)
+        with self.lock:
+            self.checked += 1
+            self.safe += safe
+            self.seconds += time.perf_counter() - start
+        return safe
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "checked": self.checked,
+                "safe": self.safe,
+                "ms/check": round(self.seconds / self.checked * 1000, 2) if self.checked else None,
+            }
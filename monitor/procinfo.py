@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessCache:
+    """Executable names of processes, keyed by (pid, create time).
+
+    A pid is reused once its process exits, so the create time is part of
+    the key: a new process with an old pid is a miss. Reading the create
+    time opens the process, so a pid checked less than `revalidate`
+    seconds ago is trusted without it - the foreground window stays the
+    same for many polls.
+
+    The cache is bounded, least recently used first out, and the entries
+    of exited processes are swept out every sweep_interval seconds.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        revalidate: float = 5,
+        sweep_interval: float = 60,
+        clock=time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.revalidate = revalidate
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.sweep_timer = clock()
+        self.entries = OrderedDict()  # (pid, create time) -> name
+        self.checked = {}  # pid -> (key, when its create time was read)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.opened = 0  # Processes opened to read the create time
+
+    def name(self, pid: int) -> str:
+        """The executable name of a process, raises psutil.Error"""
+        now = self.clock()
+        with self.lock:
+            key, checked = self.checked.get(pid, (None, 0.0))
+            if key in self.entries and now - checked < self.revalidate:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        process = psutil.Process(pid)  # Reads the create time
+        key = (pid, process.create_time())
+        with self.lock:
+            self.opened += 1
+            self.checked[pid] = (key, now)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        name = process.name()
+        with self.lock:
+            self.entries[key] = name
+            while len(self.entries) > self.max_size:
+                self.drop(next(iter(self.entries)))
+        self.sweep()
+        return name
+
+    def drop(self, key: tuple) -> None:
+        """Remove an entry, with the lock held"""
+        if self.entries.pop(key, None) is not None:
+            self.evicted += 1
+        if self.checked.get(key[0], (None,))[0] == key:
+            del self.checked[key[0]]
+
+    def sweep(self) -> None:
+        """Drop the entries of the processes that exited"""
+        if self.clock() - self.sweep_timer < self.sweep_interval:
+            return
+        self.sweep_timer = self.clock()
+        with self.lock:
+            keys = list(self.entries)
+        for pid, create_time in keys:
+            try:
+                alive = psutil.Process(pid).create_time() == create_time
+            except psutil.Error:
+                alive = False
+            if not alive:
+                with self.lock:
+                    self.drop((pid, create_time))
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "opened": self.opened,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+class DpiCache:
+    """The DPI of the last window looked up.
+
+    The foreground window rarely changes between polls, so its DPI is kept
+    until another window comes to the foreground - or max_age seconds, in
+    case it was moved to a display with another DPI.
+    """
+
+    def __init__(self, max_age: float = 10, clock=time.monotonic) -> None:
+        self.max_age = max_age
+        self.clock = clock
+        self.window = None
+        self.dpi = None
+        self.timer = 0.0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, window, lookup) -> int:
+        """The DPI of a window (a hashable handle), lookup(window) on a miss"""
+        now = self.clock()
+        with self.lock:
+            if window == self.window and now - self.timer < self.max_age:
+                self.hits += 1
+                return self.dpi
+            self.misses += 1
+        dpi = lookup(window)
+        with self.lock:
+            self.window, self.dpi, self.timer = window, dpi, now
+        return dpi
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
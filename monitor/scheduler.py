@@ -0,0 +1,203 @@
+import json
+import logging
+import random
+from collections import deque
+from types import SimpleNamespace
+
+from .debounce import WindowDebouncer
+
+logger = logging.getLogger(__name__)
+
+NSFW_TYPES = ("NSFW", "NSFW_META", "NSFW_IMAGE")
+IMAGE_TYPES = ("IMAGE", "NSFW", "NSFW_IMAGE", "NSFW_META")
+
+
+def screenshot_type(meta: bool, image: bool, nsfw: bool) -> str | None:
+    """The screenshot type of the captures that are due"""
+    if image and nsfw:  # Keep image - scan nsfw
+        return "NSFW_IMAGE"
+    elif meta and image:  # Keep image - dont scan nsfw
+        return "IMAGE"
+    elif meta and nsfw:  # Dont keep image - scan nsfw
+        return "NSFW_META"
+    elif meta:  # Dont keep image - dont scan nsfw
+        return "META"
+    elif image:  # Keep image - dont scan nsfw
+        return "IMAGE"
+    elif nsfw:  # Dont keep image - scan nsfw
+        return "NSFW"
+    return None
+
+
+class CaptureScheduler:
+    """Decides what to capture on every monitor tick.
+
+    Starting from the meta/image/nsfw intervals:
+    - a window change triggers an NSFW scan right away
+    - while the window stays the same the image and NSFW intervals double
+      after every capture, up to max_backoff times
+    - when the system CPU is above cpu_threshold the intervals are
+      stretched cpu_stretch times
+    - at most max_images_per_minute captures grab pixels, the others
+      fall back to META
+    - nothing is captured while the user is AFK
+
+    With adaptive=False it is the previous fixed-interval schedule.
+    """
+
+    def __init__(
+        self,
+        meta_interval: float = 1,
+        image_interval: float = 300,
+        nsfw_interval: float = 10,
+        max_backoff: float = 8,
+        cpu_threshold: float = 80,
+        cpu_stretch: float = 3,
+        max_images_per_minute: int | None = 12,
+        adaptive: bool = True,
+    ) -> None:
+        self.meta_interval = meta_interval
+        self.image_interval = image_interval
+        self.nsfw_interval = nsfw_interval
+        self.max_backoff = max_backoff
+        self.cpu_threshold = cpu_threshold
+        self.cpu_stretch = cpu_stretch
+        self.max_images_per_minute = max_images_per_minute
+        self.adaptive = adaptive
+
+        self.meta_timer = self.image_timer = self.nsfw_timer = None
+        self.backoff = 1.0
+        self.images = deque()  # Times of the recent image captures
+
+    def reset(self, now: float) -> None:
+        """Start the timers - the first captures are one interval away"""
+        self.meta_timer = self.image_timer = self.nsfw_timer = now
+
+    def decide(self, now: float, changed: bool = False, afk: bool = False, cpu: float = 0.0) -> str | None:
+        """The screenshot type to capture now, None for nothing"""
+        if self.meta_timer is None:
+            self.reset(now)
+        if afk:
+            return None
+
+        stretch = 1.0
+        if self.adaptive:
+            if changed:
+                self.backoff = 1.0
+            if cpu > self.cpu_threshold:
+                stretch = self.cpu_stretch
+
+        meta = now - self.meta_timer > self.meta_interval * stretch
+        image = now - self.image_timer > self.image_interval * self.backoff * stretch
+        nsfw = now - self.nsfw_timer > self.nsfw_interval * self.backoff * stretch
+        if self.adaptive and changed:
+            nsfw = True
+
+        if self.adaptive and (image or nsfw) and self.max_images_per_minute:
+            while self.images and now - self.images[0] > 60:
+                self.images.popleft()
+            if len(self.images) >= self.max_images_per_minute:
+                # Rate limited - no pixels, the timers stay due
+                image = nsfw = False
+
+        if meta:
+            self.meta_timer = now
+        if image:
+            self.image_timer = now
+        if nsfw:
+            self.nsfw_timer = now
+        if image or nsfw:
+            self.images.append(now)
+            if self.adaptive and not changed:
+                # The same window again - back off
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+
+        return screenshot_type(meta, image, nsfw)
+
+
+def read_trace(path) -> list:
+    """An activity trace - JSON lines of {"t", "title", "idle", "cpu", "nsfw"}.
+
+    Every line is the state from its t (seconds) until the next line.
+    """
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def generate_trace(hours: float = 8, seed: int = 0) -> list:
+    """A random working day - window switches, breaks, CPU spikes and a few
+    NSFW windows"""
+    rng = random.Random(seed)
+    trace = []
+    t = 0.0
+    n = 0
+    while t < hours * 3600:
+        n += 1
+        if rng.random() < 0.03:  # A break
+            trace.append({"t": t, "title": f"Window {n}", "idle": 600, "cpu": 5, "nsfw": False})
+            t += rng.uniform(300, 1800)
+            continue
+        trace.append({
+            "t": t,
+            "title": f"Window {n}",
+            "idle": 0,
+            "cpu": 95 if rng.random() < 0.1 else rng.uniform(5, 40),
+            "nsfw": rng.random() < 0.05,
+        })
+        # Mostly short visits, some long static windows
+        t += rng.expovariate(1 / 30) if rng.random() < 0.9 else rng.uniform(300, 1800)
+    return trace
+
+
+def simulate(trace: list, scheduler: CaptureScheduler, stable: float = 5, away: float = 60, tick: float = 1.0) -> dict:
+    """Replay a trace through the debouncer and a scheduler, one tick per second.
+
+    Reports the captures per type, the captures grabbing pixels and the
+    detection latency: seconds from an NSFW window coming to the foreground
+    to the first NSFW scan of it.
+    """
+    now = trace[0]["t"]
+    end = trace[-1]["t"] + 60
+    position = 0
+
+    def state():
+        return trace[position]
+
+    debouncer = WindowDebouncer(
+        lambda: SimpleNamespace(title=state()["title"]), stable=stable, clock=lambda: now
+    )
+    captures = {}
+    latencies = []
+    missed = 0
+    scanned = False
+
+    while now < end:
+        while position + 1 < len(trace) and trace[position + 1]["t"] <= now:
+            if state()["nsfw"] and not scanned:
+                missed += 1
+            position += 1
+            scanned = False
+
+        current = state()
+        changed = debouncer.poll() is not None
+        if debouncer.window is not None:
+            kind = scheduler.decide(now, changed, current["idle"] > away, current["cpu"])
+            if kind:
+                captures[kind] = captures.get(kind, 0) + 1
+                if kind in NSFW_TYPES and current["nsfw"] and not scanned:
+                    scanned = True
+                    latencies.append(now - current["t"])
+        now += tick
+
+    if state()["nsfw"] and not scanned:
+        missed += 1
+    latencies.sort()
+    return {
+        "captures": sum(captures.values()),
+        "image_captures": sum(v for k, v in captures.items() if k in IMAGE_TYPES),
+        "by_type": captures,
+        "nsfw_windows": len(latencies) + missed,
+        "nsfw_missed": missed,
+        "detection_p50_s": round(latencies[len(latencies) // 2], 1) if latencies else None,
+        "detection_max_s": round(latencies[-1], 1) if latencies else None,
+    }
@@ -0,0 +1,201 @@
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+
+from openchaver.decorators import handle_error, restart_on_exception
+from openchaver.dirs import get_data_dir
+from .transport import Transport
+
+logger = logging.getLogger(__name__)
+
+# Eviction order - the lowest priority and oldest events go first
+PRIORITIES = {
+    "META": 0,
+    "IMAGE": 1,
+    "NSFW_META": 2,
+    "NSFW": 2,
+    "NSFW_IMAGE": 2,
+}
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    priority INTEGER NOT NULL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_eviction_idx ON events (priority, id);
+"""
+
+
+class Spool:
+    """Disk-backed queue of the events waiting to be uploaded.
+
+    A small SQLite database next to the monitor: the capture appends
+    events, the Flusher uploads and deletes them. The spool is bounded in
+    events and bytes - when it is full the lowest priority, oldest events
+    are evicted, so META rows go before the NSFW captures.
+
+    Every thread opens its own Spool - SQLite connections are not shared.
+    """
+
+    def __init__(self, path=None, max_bytes=None, max_events=None) -> None:
+        config = settings.SPOOL
+        self.path = Path(path or config["PATH"] or get_data_dir("monitor") / "spool.sqlite3")
+        self.max_bytes = max_bytes or config["MAX_BYTES"]
+        self.max_events = max_events or config["MAX_EVENTS"]
+        self.evicted = 0
+        self.db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        self.db.executescript(SCHEMA)
+
+    def put(self, payload: dict, priority: int | None = None) -> int:
+        """Append an event, evicting others if the spool is full"""
+        if priority is None:
+            priority = PRIORITIES.get(payload.get("screenshot_type"), 0)
+        data = json.dumps(payload).encode()
+
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.db.execute(
+                "INSERT INTO events (priority, created, size, payload) VALUES (?, ?, ?, ?)",
+                (priority, time.time(), len(data), data),
+            )
+            self.evict()
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return cursor.lastrowid
+
+    def evict(self) -> None:
+        count, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM events"
+        ).fetchone()
+        while count > self.max_events or size > self.max_bytes:
+            pk, event_size, priority = self.db.execute(
+                "SELECT id, size, priority FROM events ORDER BY priority, id LIMIT 1"
+            ).fetchone()
+            self.db.execute("DELETE FROM events WHERE id = ?", (pk,))
+            count -= 1
+            size -= event_size
+            self.evicted += 1
+            logger.debug(f"Spool is full - evicted event {pk} (priority {priority})")
+
+    def peek(self, max_events: int, max_bytes: int) -> list[tuple[int, bytes]]:
+        """The oldest events, up to max_events and max_bytes (at least one)"""
+        batch = []
+        total = 0
+        rows = self.db.execute(
+            "SELECT id, size, payload FROM events ORDER BY id LIMIT ?", (max_events,)
+        )
+        for pk, size, payload in rows:
+            if batch and total + size > max_bytes:
+                break
+            batch.append((pk, payload))
+            total += size
+        return batch
+
+    def ack(self, ids: list[int]) -> None:
+        """Delete the uploaded events"""
+        self.db.executemany("DELETE FROM events WHERE id = ?", [(pk,) for pk in ids])
+
+    def stats(self) -> dict:
+        count, size, oldest = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(created) FROM events"
+        ).fetchone()
+        return {
+            "events": count,
+            "bytes": size,
+            "oldest_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "evicted": self.evicted,
+        }
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class Flusher:
+    """Drains the spool to the ingest endpoint in batches.
+
+    While the server is unreachable the flusher backs off up to
+    MAX_FLUSH_BACKOFF and the events stay on disk.
+    """
+
+    def __init__(self, spool: Spool | None = None, transport: Transport | None = None) -> None:
+        config = settings.SPOOL
+        self.spool = spool or Spool()
+        self.transport = transport or Transport()
+        self.batch_size = config["BATCH_SIZE"]
+        self.batch_bytes = config["BATCH_BYTES"]
+        self.interval = config["FLUSH_INTERVAL"]
+        self.max_backoff = config["MAX_FLUSH_BACKOFF"]
+        self.single = False  # Send one event at a time to find a rejected one
+        self.stats_timer = time.time()
+
+    def flush(self) -> int:
+        """Upload one batch. Returns the number of events sent"""
+        batch = self.spool.peek(1 if self.single else self.batch_size, self.batch_bytes)
+        if not batch:
+            return 0
+
+        ids = [pk for pk, _ in batch]
+        body = b"[" + b",".join(payload for _, payload in batch) + b"]"
+        try:
+            self.transport.send("ingest/", body)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status is None or status >= 500:
+                raise
+            if len(batch) > 1:
+                logger.warning(f"Batch rejected ({status}) - sending one by one")
+                self.single = True
+                return 0
+            # Retrying a rejected event would block the spool forever
+            logger.error(f"Dropping event {ids[0]} rejected by the server ({status})")
+        else:
+            self.single = False
+
+        self.spool.ack(ids)
+        return len(batch)
+
+    def log_stats(self) -> None:
+        """Log the upload latency, bytes on the wire and the spool depth"""
+        if time.time() - self.stats_timer > settings.TRANSPORT["STATS_INTERVAL"]:
+            self.stats_timer = time.time()
+            logger.info(
+                f"Upload stats: {self.transport.stats.as_dict()} "
+                f"spool: {self.spool.stats()}"
+            )
+
+    def run(self) -> None:
+        backoff = self.interval
+        while True:
+            try:
+                sent = self.flush()
+                backoff = self.interval
+            except requests.RequestException as e:
+                logger.debug(f"Server unreachable ({e}) - retrying in {backoff}s")
+                sent = 0
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            self.log_stats()
+            if not sent:
+                time.sleep(self.interval)
+
+
+@restart_on_exception
+@handle_error
+def run_flusher():
+    """Upload the spooled events"""
+    Flusher().run()
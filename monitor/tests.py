@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from core.image_utils import decode_base64_to_numpy
+from core.samples import sample_screenshot
+from .capture import FramePool
+from .debounce import WindowDebouncer
+from .dedupe import FrameDeduplicator
+
+
+class FramePoolTests(SimpleTestCase):
+    def test_buffers_are_reused(self):
+        pool = FramePool()
+        frame = pool.acquire((720, 1280, 3))
+        pool.release(frame)
+        self.assertIs(pool.acquire((720, 1280, 3)), frame)
+        self.assertEqual(pool.allocated, 1)
+
+    def test_old_shapes_are_dropped(self):
+        pool = FramePool(max_shapes=2)
+        for width in range(100, 200):
+            pool.release(pool.acquire((90, width, 3)))
+        self.assertEqual(list(pool.free), [(90, 198, 3), (90, 199, 3)])
+        self.assertEqual(pool.nbytes(), 90 * (198 + 199) * 3)
+        self.assertEqual(pool.dropped, 98)
+
+
+class FrameDeduplicatorTests(SimpleTestCase):
+    def setUp(self):
+        self.frame = decode_base64_to_numpy(sample_screenshot())
+
+    def test_only_archived_frames_are_referred_to(self):
+        dedupe = FrameDeduplicator()
+        # An NSFW capture may be deleted by the server - never a reference
+        self.assertEqual(dedupe.check("Docs", self.frame, reference=False), (None, False))
+        self.assertEqual(dedupe.check("Docs", self.frame, reference=False), (None, False))
+
+        frame_id, unchanged = dedupe.check("Docs", self.frame)
+        self.assertFalse(unchanged)
+        self.assertEqual(dedupe.check("Docs", self.frame, reference=False), (frame_id, True))
+        self.assertEqual(dedupe.check("Docs", self.frame), (frame_id, True))
+
+
+class WindowDebouncerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.window = None
+        # One poll a second on a fake clock
+        self.debouncer = WindowDebouncer(lambda: self.window, stable=3, clock=lambda: self.now)
+
+    def poll(self, title: str | None):
+        self.window = SimpleNamespace(title=title) if title else None
+        window = self.debouncer.poll()
+        self.now += 1
+        return window
+
+    def test_stable_window_is_emitted_once(self):
+        self.assertEqual([self.poll("Docs") for _ in range(3)], [None] * 3)
+        self.assertEqual(self.poll("Docs").title, "Docs")
+        self.assertEqual([self.poll("Docs") for _ in range(3)], [None] * 3)
+        self.assertEqual(self.debouncer.changes, 1)
+
+    def test_title_change_resets_the_timer(self):
+        self.poll("Docs")
+        self.poll("Docs")
+        self.assertIsNone(self.poll("Mail"))
+        self.assertEqual([self.poll("Mail") for _ in range(2)], [None] * 2)
+        self.assertEqual(self.poll("Mail").title, "Mail")
+        self.assertEqual(self.debouncer.changes, 1)
+
+    def test_no_window_emits_nothing(self):
+        self.assertEqual([self.poll(None) for _ in range(10)], [None] * 10)
+        self.assertEqual(self.debouncer.changes, 0)
+        self.assertFalse(self.debouncer.stats()["settling"])
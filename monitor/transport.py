@@ -0,0 +1,166 @@
+import gzip
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from openchaver.const import PORT
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = (None, "gzip", "zstd")
+
+# Responses worth another try - the server is busy or restarting
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def compress(data: bytes, compression: str | None) -> tuple[bytes, str | None]:
+    """Compress a request body, returns (body, Content-Encoding)"""
+    if compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).compress(data), "zstd"
+    if compression == "gzip":
+        # Level 6 - the image is already PNG, higher levels gain nothing
+        return gzip.compress(data, compresslevel=6), "gzip"
+    return data, None
+
+
+class TransportStats:
+    """Latency and bytes on the wire of the uploads"""
+
+    def __init__(self, window: int = 1000) -> None:
+        self.uploads = 0
+        self.failures = 0
+        self.retries = 0
+        self.bytes_raw = 0
+        self.bytes_sent = 0
+        self.latencies = deque(maxlen=window)  # Seconds, the last uploads only
+        self.lock = threading.Lock()
+
+    def record(self, latency: float, raw: int, sent: int) -> None:
+        with self.lock:
+            self.uploads += 1
+            self.bytes_raw += raw
+            self.bytes_sent += sent
+            self.latencies.append(latency)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            latencies = list(self.latencies)
+            stats = {
+                "uploads": self.uploads,
+                "failures": self.failures,
+                "retries": self.retries,
+                "bytes_raw": self.bytes_raw,
+                "bytes_sent": self.bytes_sent,
+                "compression_ratio": round(self.bytes_sent / self.bytes_raw, 3)
+                if self.bytes_raw
+                else 1.0,
+            }
+        if len(latencies) > 1:
+            q = statistics.quantiles(latencies, n=100)
+            stats.update(
+                p50_ms=round(q[49] * 1000, 1),
+                p95_ms=round(q[94] * 1000, 1),
+                p99_ms=round(q[98] * 1000, 1),
+            )
+        return stats
+
+
+class Transport:
+    """Uploads to the OpenChaver API over a pooled keep-alive session.
+
+    Every request has a connect and read timeout. Connection errors,
+    timeouts and busy responses are retried with exponential backoff and
+    full jitter, so restarted monitors do not retry in lockstep.
+    """
+
+    def __init__(self, base_url: str | None = None, **options) -> None:
+        config = {**settings.TRANSPORT, **options}
+        self.base_url = base_url or config["URL"] or f"http://127.0.0.1:{PORT}/api/"
+        self.timeout = (config["CONNECT_TIMEOUT"], config["READ_TIMEOUT"])
+        self.retries = config["RETRIES"]
+        self.backoff = config["BACKOFF"]
+        self.max_backoff = config["MAX_BACKOFF"]
+        self.compression = config["COMPRESSION"]
+        self.min_compress_size = config["MIN_COMPRESS_SIZE"]
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {self.compression}")
+        if self.compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                logger.warning("zstandard is not installed - using gzip")
+                self.compression = "gzip"
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config["POOL_SIZE"])
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = TransportStats()
+
+    def delay(self, attempt: int, response=None) -> float:
+        """Seconds to wait before the next attempt"""
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                return min(float(response.headers["Retry-After"]), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def post(self, path: str, payload) -> requests.Response:
+        """POST a JSON payload, retrying the transient failures"""
+        return self.send(path, json.dumps(payload).encode())
+
+    def send(self, path: str, body: bytes) -> requests.Response:
+        """POST an encoded JSON body, retrying the transient failures"""
+        headers = {"Content-Type": "application/json"}
+        sent = body
+        if self.compression and len(body) >= self.min_compress_size:
+            sent, encoding = compress(body, self.compression)
+            if encoding:
+                headers["Content-Encoding"] = encoding
+
+        url = self.base_url + path
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.post(
+                    url, data=sent, headers=headers, timeout=self.timeout
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    self.stats.record(time.perf_counter() - start, len(body), len(sent))
+                    return response
+                error = requests.HTTPError(
+                    f"{response.status_code} from {url}", response=response
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.HTTPError:
+                with self.stats.lock:
+                    self.stats.failures += 1
+                raise
+
+            if attempt < self.retries:
+                delay = self.delay(attempt, response)
+                logger.debug(f"Upload failed ({error}) - retrying in {delay:.2f}s")
+                with self.stats.lock:
+                    self.stats.retries += 1
+                time.sleep(delay)
+
+        with self.stats.lock:
+            self.stats.failures += 1
+        raise error
+
+    def close(self) -> None:
+        self.session.close()
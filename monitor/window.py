@@ -1,12 +1,16 @@
+from __future__ import annotations
+
 import logging
-import os
-import psutil
-import time
-import numpy as np
-import cv2 as cv
-import mss
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from django.conf import settings
 
 from core.image_utils import encode_numpy_to_base64
+from .capture import FramePool, ScreenCapture, get_capture
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -38,6 +42,14 @@ class WindowDestroyed(Exception):
 
 
 class WindowBase:
+    """A window of a window backend.
+
+    A backend subclasses it as its Window class and implements
+    get_active_window, get_coordinates and seconds_since_last_input, and
+    sets title, exec_name, pid and dpi.
+    """
+    DEFAULT_DPI = 96
+
     def __init__(self) -> None:
         self.nsfw_detections = None
         self.is_nsfw = False
@@ -50,22 +62,29 @@ class WindowBase:
 
     def take_screenshot(self) -> str:
         """Get a screenshot of the window"""
+        return encode_numpy_to_base64(self.grab())
+
+    def grab(self, pool: FramePool | None = None) -> np.ndarray:
+        """Get the pixels of the window - the encoding is left to the caller.
+
+        With a pool the image is one of its buffers - release it when done.
+        """
 
         # Get the coordinates of the window
         coordinates = self.get_coordinates()
 
-        # Get the image
-        with mss.mss() as sct:
-            image = sct.grab(coordinates)
-            image = np.array(image)[:, :, :3]  # Remove alpha channel
-
         # Scale image to self.DEFAULT_DPI DPI
+        scale = 1.0
         if self.dpi != self.DEFAULT_DPI:
             logger.debug(f"Scaling image to {self.DEFAULT_DPI} DPI")
             scale = self.dpi / self.DEFAULT_DPI
-            image = cv.resize(image, None, fx=scale, fy=scale)
 
-        return encode_numpy_to_base64(image)
+        # Reuse the display handles and buffers of this thread
+        return self.capture().grab(coordinates, scale, pool)
+
+    def capture(self) -> ScreenCapture:
+        """The screen capture of the calling thread"""
+        return get_capture()
 
     def stable_check(self) -> None:
         """Check if the window is stable"""
@@ -78,109 +97,38 @@ class WindowBase:
         except:  # noqa: E722
             raise UnstableWindow
 
-
-if os.name == "nt":
-    import ctypes
-    import win32ui
-    import win32process as wproc
-    
-
-    class Window(WindowBase):
-        DEFAULT_DPI = 96
-        user32 = ctypes.windll.user32
-
-        def __init__(self, hwnd):
-            super().__init__()
-
-            self.hwnd = hwnd
-            self.title = "Unknown Title"
-            self.exec_name = "Unknown Executable"
-            self.pid = -1
-
-            # Get the window title
-            try:
-                self.title = self.hwnd.GetWindowText()
-            except:  # noqa: E722
-                logger.exception("Unable to get window title")
-
-            # Get the window process ID and executable path
-            try:
-                self.pid = wproc.GetWindowThreadProcessId(self.hwnd.GetSafeHwnd())[1]
-                self.exec_name = psutil.Process(self.pid).name()
-            except:  # noqa: E722
-                logger.exception("Unable to get window pid | exec_name")
-
-            # Get the window DPI
-            try:
-                self.dpi = self.user32.GetDpiForWindow(self.hwnd.GetSafeHwnd())
-            except:  # noqa: E722
-                logger.exception(
-                    f"Unable to get window DPI - defaulting to {self.DEFAULT_DPI}"  # noqa: E501
-                )
-                self.dpi = self.DEFAULT_DPI
-
-        def get_coordinates(self):
-            """Get the coordinates of the window"""
-
-            # The following code is used to calculate the coordinates of
-            # the window with the border monitor pixels removed
-            try:
-                client_rect = self.hwnd.GetClientRect()
-                logger.debug(f"Client rect: {client_rect}")
-
-                window_rect = self.hwnd.GetWindowRect()
-                logger.debug(f"Window rect: {window_rect}")
-                client_width = client_rect[2] - client_rect[0]
-                window_width = window_rect[2] - window_rect[0]
-                border = (window_width - client_width) // 2
-
-                coordinates = (
-                    window_rect[0] + border,
-                    window_rect[1] + border,
-                    window_rect[2] - border,
-                    window_rect[3] - border,
-                )
-                logger.debug(f"Calculated coordinates: {coordinates}")
-
-                return coordinates
-            except:  # noqa: E722
-                logger.exception("Unable to get window coordinates")
-                raise WindowDestroyed
-
-        @classmethod
-        def get_active_window(
-            cls,
-            invalid_title: str | None = None,
-            stable: bool | int = False,
-            recursive: bool = False,
-        ):
-            """Get the active window"""
-            try:
-                # Get the active window
-                hwnd = win32ui.GetForegroundWindow()
-                window = cls(hwnd)
-
-                # Check for an invalid title
-                if window.title == invalid_title:
-                    raise NoWindowFound(window.title)
-
-                if not recursive:
-                    logger.debug(f"Active window: {window.title}")
-
-                # Check if the window is stable
-                for _ in range(int(stable)):
-                    window.stable_check()
-                    time.sleep(1)
-
-                return window
-
-            except UnstableWindow:
-                raise
-            except NoWindowFound:
-                raise 
-            except:  # noqa: E722
-                raise NoWindowFound
-
-else:
-    print("Unsupported OS")
-    exit(1)
+    def get_coordinates(self) -> tuple:
+        """(left, top, right, bottom) of the window on the screen"""
+        raise NotImplementedError
+
+    @classmethod
+    def get_active_window(cls, invalid_title=None, stable=False, recursive=False):
+        """The foreground window, raises NoWindowFound"""
+        raise NotImplementedError
+
+    @staticmethod
+    def seconds_since_last_input() -> float:
+        """Seconds since the last keyboard or mouse input"""
+        raise NotImplementedError
+
+    @staticmethod
+    def cache_stats() -> dict:
+        """Hit rates of the caches of the backend"""
+        return {}
+
+
+# Window backends - the module of each one has a Window class
+BACKENDS = {
+    "win32": "monitor.window_win32",
+    "synthetic": "monitor.window_synthetic",
+}
+
+
+def get_window_class(backend: str | None = None) -> type[WindowBase]:
+    """The Window class of a backend, settings.MONITOR["BACKEND"] by default"""
+    backend = backend or settings.MONITOR["BACKEND"]
+    if backend is None:
+        raise ValueError("Unsupported OS - no window backend for this desktop")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown window backend: {backend}")
+    return import_module(BACKENDS[backend]).Window
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+
+from .capture import FramePool, ScreenCapture
+from .window import NoWindowFound, WindowBase
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def generate_windows(dwell: float, seed: int = 0):
+    """Endless random windows, each in the foreground for ~dwell seconds"""
+    from core.samples import SAMPLE_SUBJECTS, SAMPLE_WINDOWS
+
+    rng = random.Random(seed)
+    while True:
+        template, exec_name = rng.choice(SAMPLE_WINDOWS)
+        yield {
+            "title": template.format(rng.choice(SAMPLE_SUBJECTS)),
+            "exec_name": exec_name,
+            "seconds": rng.expovariate(1 / dwell),
+        }
+
+
+def read_corpus(path) -> list:
+    """A recorded corpus - JSON lines of {"title", "exec_name", "seconds"}"""
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class SyntheticDesktop:
+    """Replays the foreground windows and their frames.
+
+    The windows come from a recorded corpus (replayed in a loop) or from a
+    generator. The desktop clock runs `speed` times faster than the real
+    one, so a recorded day can be replayed in minutes.
+    """
+
+    def __init__(
+        self,
+        corpus=None,
+        speed: float = 1.0,
+        dwell: float = 5.0,
+        width: int = 1280,
+        height: int = 720,
+        seed: int = 0,
+        clock=time.monotonic,
+    ) -> None:
+        if corpus:
+            self.windows = itertools.cycle(read_corpus(corpus))
+        else:
+            self.windows = generate_windows(dwell, seed)
+        self.speed = speed
+        self.width = width
+        self.height = height
+        self.clock = clock
+        self.start = clock()
+        self.current = next(self.windows)
+        self.until = self.current["seconds"]
+        self.switches = 0
+        self.frames = {}  # title -> BGRA pixels
+        self.lock = threading.Lock()
+
+    def now(self) -> float:
+        """Seconds since the start on the desktop clock"""
+        return (self.clock() - self.start) * self.speed
+
+    def active(self) -> dict:
+        """The foreground window now"""
+        with self.lock:
+            now = self.now()
+            while now >= self.until:
+                self.current = next(self.windows)
+                self.until += max(self.current["seconds"], 0.001)
+                self.switches += 1
+            return self.current
+
+    def frame(self, title: str) -> bytearray:
+        """BGRA pixels of a window - rendered once per title"""
+        with self.lock:
+            if title not in self.frames:
+                if len(self.frames) >= 64:
+                    self.frames.pop(next(iter(self.frames)))
+                self.frames[title] = self.render(title)
+            return self.frames[title]
+
+    def render(self, title: str) -> bytearray:
+        import cv2 as cv
+        import numpy as np
+
+        image = np.full((self.height, self.width, 4), 245, dtype=np.uint8)
+        cv.rectangle(image, (0, 0), (self.width, 40), (60, 60, 60, 255), -1)
+        cv.putText(image, title, (10, 28), cv.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255, 255), 1)
+        rng = random.Random(title)
+        for y in range(70, self.height - 20, 24):
+            width = rng.randint(100, self.width - 40)
+            cv.rectangle(image, (20, y - 12), (width, y), (40, 40, 40, 255), -1)
+        return bytearray(image.tobytes())
+
+
+_desktop = None
+_desktop_lock = threading.Lock()
+
+
+def get_desktop() -> SyntheticDesktop:
+    """The desktop configured in settings.MONITOR["SYNTHETIC"]"""
+    global _desktop
+    with _desktop_lock:
+        if _desktop is None:
+            config = settings.MONITOR["SYNTHETIC"]
+            _desktop = SyntheticDesktop(
+                corpus=config["CORPUS"],
+                speed=config["SPEED"],
+                dwell=config["DWELL"],
+                width=config["WIDTH"],
+                height=config["HEIGHT"],
+                seed=config["SEED"],
+            )
+    return _desktop
+
+
+class SyntheticCapture(ScreenCapture):
+    """Grabs the frames of the synthetic desktop - no display needed"""
+
+    def __init__(self, desktop: SyntheticDesktop) -> None:
+        self.desktop = desktop
+        self.bgr = None
+
+    def grab(self, coordinates: tuple, scale: float = 1.0, pool: FramePool | None = None) -> np.ndarray:
+        raw = self.desktop.frame(self.desktop.active()["title"])
+        return self.convert(raw, self.desktop.width, self.desktop.height, scale, pool)
+
+    def close(self) -> None:
+        pass
+
+
+_local = threading.local()
+
+
+class Window(WindowBase):
+    """A window of the synthetic desktop"""
+
+    def __init__(self, desktop: SyntheticDesktop, entry: dict) -> None:
+        super().__init__()
+        self.desktop = desktop
+        self.title = entry["title"]
+        self.exec_name = entry["exec_name"]
+        self.pid = entry.get("pid", 0)
+        self.dpi = entry.get("dpi", self.DEFAULT_DPI)
+
+    def get_coordinates(self) -> tuple:
+        return (0, 0, self.desktop.width, self.desktop.height)
+
+    def capture(self) -> ScreenCapture:
+        if not hasattr(_local, "capture"):
+            _local.capture = SyntheticCapture(self.desktop)
+        return _local.capture
+
+    @classmethod
+    def get_active_window(cls, invalid_title=None, stable=False, recursive=False):
+        """The foreground window - `stable` is left to the WindowDebouncer"""
+        desktop = get_desktop()
+        window = cls(desktop, desktop.active())
+        if window.title == invalid_title:
+            raise NoWindowFound(window.title)
+        return window
+
+    @staticmethod
+    def seconds_since_last_input() -> float:
+        return 0.0  # Always busy
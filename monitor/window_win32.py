@@ -0,0 +1,119 @@
+import ctypes
+import logging
+import time
+
+import win32ui
+import win32process as wproc
+
+from .afk import seconds_since_last_input
+from .procinfo import DpiCache, ProcessCache
+from .window import NoWindowFound, UnstableWindow, WindowBase, WindowDestroyed
+
+logger = logging.getLogger(__name__)
+
+# The foreground window is looked up on every monitor poll
+process_cache = ProcessCache()
+dpi_cache = DpiCache()
+
+
+class Window(WindowBase):
+    """The foreground window of the Windows desktop"""
+    DEFAULT_DPI = 96
+    user32 = ctypes.windll.user32
+    seconds_since_last_input = staticmethod(seconds_since_last_input)
+
+    def __init__(self, hwnd):
+        super().__init__()
+
+        self.hwnd = hwnd
+        self.title = "Unknown Title"
+        self.exec_name = "Unknown Executable"
+        self.pid = -1
+
+        # Get the window title
+        try:
+            self.title = self.hwnd.GetWindowText()
+        except:  # noqa: E722
+            logger.exception("Unable to get window title")
+
+        # Get the window process ID and executable path
+        try:
+            self.pid = wproc.GetWindowThreadProcessId(self.hwnd.GetSafeHwnd())[1]
+            self.exec_name = process_cache.name(self.pid)
+        except:  # noqa: E722
+            logger.exception("Unable to get window pid | exec_name")
+
+        # Get the window DPI
+        try:
+            self.dpi = dpi_cache.get(self.hwnd.GetSafeHwnd(), self.user32.GetDpiForWindow)
+        except:  # noqa: E722
+            logger.exception(
+                f"Unable to get window DPI - defaulting to {self.DEFAULT_DPI}"  # noqa: E501
+            )
+            self.dpi = self.DEFAULT_DPI
+
+    def get_coordinates(self):
+        """Get the coordinates of the window"""
+
+        # The following code is used to calculate the coordinates of
+        # the window with the border monitor pixels removed
+        try:
+            client_rect = self.hwnd.GetClientRect()
+            logger.debug(f"Client rect: {client_rect}")
+
+            window_rect = self.hwnd.GetWindowRect()
+            logger.debug(f"Window rect: {window_rect}")
+            client_width = client_rect[2] - client_rect[0]
+            window_width = window_rect[2] - window_rect[0]
+            border = (window_width - client_width) // 2
+
+            coordinates = (
+                window_rect[0] + border,
+                window_rect[1] + border,
+                window_rect[2] - border,
+                window_rect[3] - border,
+            )
+            logger.debug(f"Calculated coordinates: {coordinates}")
+
+            return coordinates
+        except:  # noqa: E722
+            logger.exception("Unable to get window coordinates")
+            raise WindowDestroyed
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return {"process": process_cache.stats(), "dpi": dpi_cache.stats()}
+
+    @classmethod
+    def get_active_window(
+        cls,
+        invalid_title: str | None = None,
+        stable: bool | int = False,
+        recursive: bool = False,
+    ):
+        """Get the active window"""
+        try:
+            # Get the active window
+            hwnd = win32ui.GetForegroundWindow()
+            window = cls(hwnd)
+
+            # Check for an invalid title
+            if window.title == invalid_title:
+                raise NoWindowFound(window.title)
+
+            if not recursive:
+                logger.debug(f"Active window: {window.title}")
+
+            # Check if the window is stable
+            for _ in range(int(stable)):
+                window.stable_check()
+                time.sleep(1)
+
+            return window
+
+        except UnstableWindow:
+            raise
+        except NoWindowFound:
+            raise 
+        except:  # noqa: E722
+            raise NoWindowFound
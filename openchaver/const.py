@@ -23,9 +23,6 @@ CONFIG_DIR = get_config_dir()
 WATCHER_LOGS = INSTALL_DIR / "watcher.log"
 SERVICE_LOGS = INSTALL_DIR / "service.log"
 
-# Delete old logs
-delete_old_logs(INSTALL_DIR,keep = [WATCHER_LOGS,SERVICE_LOGS])
-
 # Commands
 MIGRATE_ARGS = ["migrate"]    # Migrates the database
 SERVICE_ARGS = ["runservice"] # Runs the main service in the service manager
@@ -45,26 +42,30 @@ MONITOR_COMMAND = [str(BASE_EXE)] + MONITOR_ARGS
 
 PORT = 61313
 
-# Log all variables to the service log
-logger.info("BASE_EXE: %s", BASE_EXE)
-logger.info("TESTING: %s", TESTING)
-logger.info("SERVICE_NAME: %s", SERVICE_NAME)
-logger.info("WATCHER_NAME: %s", WATCHER_NAME)
-logger.info("INSTALL_DIR: %s", INSTALL_DIR)
-logger.info("DATA_DIR: %s", DATA_DIR)
-logger.info("CONFIG_DIR: %s", CONFIG_DIR)
-logger.info("WATCHER_LOGS: %s", WATCHER_LOGS)
-logger.info("SERVICE_LOGS: %s", SERVICE_LOGS)
-logger.info("MIGRATE_ARGS: %s", MIGRATE_ARGS)
-logger.info("SERVICE_ARGS: %s", SERVICE_ARGS)
-logger.info("WATCHER_ARGS: %s", WATCHER_ARGS)
-logger.info("MONITOR_ARGS: %s", MONITOR_ARGS)
-logger.info("MIGRATE_COMMAND: %s", MIGRATE_COMMAND)
-logger.info("SERVICE_COMMAND: %s", SERVICE_COMMAND)
-logger.info("WATCHER_COMMAND: %s", WATCHER_COMMAND)
-logger.info("MONITOR_COMMAND: %s", MONITOR_COMMAND)
-logger.info("PORT: %s", PORT)
-
 
+def init_service_logs():
+    """Delete the old logs and log all variables to the service log.
 
+    Called by the services when they start - importing this module has no
+    side effects, so the monitor and the other commands can use it.
+    """
+    delete_old_logs(INSTALL_DIR, keep=[WATCHER_LOGS, SERVICE_LOGS])
 
+    logger.info("BASE_EXE: %s", BASE_EXE)
+    logger.info("TESTING: %s", TESTING)
+    logger.info("SERVICE_NAME: %s", SERVICE_NAME)
+    logger.info("WATCHER_NAME: %s", WATCHER_NAME)
+    logger.info("INSTALL_DIR: %s", INSTALL_DIR)
+    logger.info("DATA_DIR: %s", DATA_DIR)
+    logger.info("CONFIG_DIR: %s", CONFIG_DIR)
+    logger.info("WATCHER_LOGS: %s", WATCHER_LOGS)
+    logger.info("SERVICE_LOGS: %s", SERVICE_LOGS)
+    logger.info("MIGRATE_ARGS: %s", MIGRATE_ARGS)
+    logger.info("SERVICE_ARGS: %s", SERVICE_ARGS)
+    logger.info("WATCHER_ARGS: %s", WATCHER_ARGS)
+    logger.info("MONITOR_ARGS: %s", MONITOR_ARGS)
+    logger.info("MIGRATE_COMMAND: %s", MIGRATE_COMMAND)
+    logger.info("SERVICE_COMMAND: %s", SERVICE_COMMAND)
+    logger.info("WATCHER_COMMAND: %s", WATCHER_COMMAND)
+    logger.info("MONITOR_COMMAND: %s", MONITOR_COMMAND)
+    logger.info("PORT: %s", PORT)
@@ -1,19 +1,31 @@
 import functools
 import logging
+import threading
 import time
 
 
-def restart_on_exception(f, delay=1, exception=Exception):  # pragma: no cover
+def restart_on_exception(f, delay=1, max_delay=60, exception=Exception):  # pragma: no cover
+    """Restart f when it raises, after delay seconds doubled on every crash
+    up to max_delay (reset once f ran for max_delay seconds).
+
+    In a thread of the Supervisor the exception is raised instead - the
+    supervisor restarts it with its own backoff and keeps the stats.
+    """
     @functools.wraps(f)
     def g(*args, **kwargs):
+        wait = delay
         while True:
+            started = time.monotonic()
             try:
                 f(*args, **kwargs)
             except exception:
-                logging.exception(f"{f.__name__} crashed due to exception, restarting.")
-                time.sleep(
-                    delay
-                )  # To prevent extremely fast restarts in case of bad state.
+                if getattr(threading.current_thread(), "supervised", False):
+                    raise
+                if time.monotonic() - started > max_delay:
+                    wait = delay
+                logging.exception(f"{f.__name__} crashed due to exception, restarting in {wait}s.")
+                time.sleep(wait)  # To prevent extremely fast restarts in case of bad state.
+                wait = min(wait * 2, max_delay)
 
     return g
 
@@ -0,0 +1,58 @@
+import logging
+
+from django.conf import settings
+
+from .const import PORT
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("waitress", "uvicorn", "runserver")
+
+
+def run_server(port: int = PORT, backend: str | None = None, threads: int | None = None):
+    """Serve the API with the configured backend (settings.SERVER)"""
+    config = settings.SERVER
+    backend = backend or config["BACKEND"]
+    threads = threads or config["THREADS"]
+    logger.info(f"Starting the {backend} server on port {port}")
+
+    if backend == "runserver":
+        from django.core.management import call_command
+
+        call_command("runserver", f"{config['HOST']}:{port}", "--noreload")
+
+    elif backend == "waitress":
+        from waitress import serve
+        from django.contrib.staticfiles.handlers import StaticFilesHandler
+        from .wsgi import application
+
+        # Serve the admin static files like runserver does
+        serve(
+            StaticFilesHandler(application),
+            host=config["HOST"],
+            port=port,
+            threads=threads,
+            connection_limit=config["CONNECTION_LIMIT"],
+            channel_timeout=config["CHANNEL_TIMEOUT"],
+            ident="OpenChaver",
+        )
+
+    elif backend == "uvicorn":
+        import uvicorn
+        from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+        from .asgi import application
+
+        # Runs in a supervised thread - uvicorn skips the signal handlers
+        uvicorn.Server(
+            uvicorn.Config(
+                ASGIStaticFilesHandler(application),
+                host=config["HOST"],
+                port=port,
+                timeout_keep_alive=config["CHANNEL_TIMEOUT"],
+                limit_concurrency=config["CONNECTION_LIMIT"],
+                lifespan="off",
+            )
+        ).run()
+
+    else:
+        raise ValueError(f"Unknown server backend: {backend}")
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from .dirs import get_config_dir, get_install_dir
 
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.decompress_middleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -74,6 +76,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "openchaver.wsgi.application"
+ASGI_APPLICATION = "openchaver.asgi.application"
 
 
 # Database
@@ -82,10 +85,27 @@ WSGI_APPLICATION = "openchaver.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": get_install_dir() / "db.sqlite3",
+        "NAME": os.environ.get("OPENCHAVER_DB", get_install_dir() / "db.sqlite3"),
+        # Keep connections open between requests - the monitor posts every second
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+        },
     }
 }
 
+# SQLite pragmas applied to every new connection (see core/db.py)
+# WAL lets the monitor ingest, the analysis and the admin read at the same time
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Durable in WAL mode, no fsync on every commit
+    "mmap_size": 256 * 1024 * 1024,  # 256 MB
+    "cache_size": -64 * 1024,  # Negative is KiB -> 64 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 20 * 1000,  # ms
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -172,6 +192,106 @@ LOGGING = {
     },
 }
 
+# API server started by runservice (see openchaver/server.py)
+SERVER = {
+    # "waitress" (threaded WSGI), "uvicorn" (ASGI) or "runserver" (development)
+    "BACKEND": "waitress",
+    "HOST": "127.0.0.1",
+    "THREADS": 8,  # Worker threads handling requests
+    "CONNECTION_LIMIT": 100,
+    "CHANNEL_TIMEOUT": 120,  # Seconds before an idle keep-alive connection is closed
+}
+
+# Async ingest queue (see core/ingest.py)
+INGEST = {
+    "QUEUE_SIZE": 64,  # Screenshots waiting to be written, 503 when full
+    "MAX_BATCH": 64,  # Screenshots per request - a batch is queued whole or not at all
+    "WORKERS": 1,  # Threads writing the screenshots - SQLite has a single writer
+}
+
+# Monitor window backend (see monitor/window.py)
+MONITOR = {
+    # There is no backend for the real desktop of other OSes
+    "BACKEND": "win32" if os.name == "nt" else None,
+    # Replays fake windows and frames - for profiling the monitor without a
+    # desktop, only used when asked for (runmonitor --backend synthetic)
+    "SYNTHETIC": {
+        "CORPUS": None,  # JSON lines of {"title", "exec_name", "seconds"}, random windows if None
+        "SPEED": 1.0,  # Desktop clock speed-up
+        "DWELL": 5.0,  # Mean seconds in the foreground of the random windows
+        "WIDTH": 1280,
+        "HEIGHT": 720,
+        "SEED": 0,
+    },
+}
+
+# Monitor uploads to the API (see monitor/transport.py)
+TRANSPORT = {
+    "URL": None,  # Defaults to the local API
+    "CONNECT_TIMEOUT": 3,  # Seconds
+    "READ_TIMEOUT": 30,  # Seconds
+    "RETRIES": 3,  # Extra attempts on connection errors, timeouts and 429/502/503/504
+    "BACKOFF": 0.5,  # Seconds, doubled every attempt with full jitter
+    "MAX_BACKOFF": 10,  # Seconds
+    "COMPRESSION": "gzip",  # None, "gzip" or "zstd" (needs the zstandard package)
+    "MIN_COMPRESS_SIZE": 1024,  # Bytes - smaller bodies are sent as is
+    "POOL_SIZE": 4,  # Keep-alive connections
+    "STATS_INTERVAL": 5 * 60,  # Seconds between the upload stats log lines
+}
+
+# Spool batches hold several screenshots - SPOOL["BATCH_BYTES"] must fit
+DATA_UPLOAD_MAX_MEMORY_SIZE = 16 * 1024 * 1024
+
+# Monitor offline spool (see monitor/spool.py)
+SPOOL = {
+    "PATH": None,  # Defaults to spool.sqlite3 in the monitor data dir
+    "MAX_BYTES": 256 * 1024 * 1024,  # Lowest priority, oldest events are evicted past this
+    "MAX_EVENTS": 10000,
+    "BATCH_SIZE": 20,  # Events per upload - must fit in INGEST["QUEUE_SIZE"]
+    "BATCH_BYTES": 8 * 1024 * 1024,  # Uncompressed bytes per upload
+    "FLUSH_INTERVAL": 1,  # Seconds between flushes when the spool is empty
+    "MAX_FLUSH_BACKOFF": 60,  # Seconds between attempts while the server is down
+}
+
+# Profanity word list and verdict cache (see core/profanity.py)
+PROFANITY = {
+    "WORD_LIST": os.environ.get("OPENCHAVER_WORD_LIST"),  # Defaults to bad_words.txt in the config dir
+    "RELOAD_INTERVAL": 10,  # Seconds between checks of the word list file
+    "CACHE_SIZE": 10000,  # Titles
+    "CACHE_TTL": 24 * 60 * 60,  # Seconds
+    "PERSIST_VERDICTS": False,  # Keep the verdicts in the TitleVerdict table across restarts
+    "PERSIST_BATCH": 100,  # Verdicts written per batch
+    "PERSIST_INTERVAL": 10,  # Seconds between the writes of a batch that is not full
+}
+
+# Thread supervisor of runservice, runmonitor and runwatcher (see openchaver/supervisor.py)
+SUPERVISOR = {
+    "BASE_DELAY": 1,  # Seconds before restarting a dead service, doubled on every failure
+    "MAX_DELAY": 60,  # Seconds
+    "STABLE_AFTER": 60,  # Seconds of running that reset the restart delay
+    "FAILURE_THRESHOLD": 5,  # Failures within FAILURE_WINDOW that open the circuit
+    "FAILURE_WINDOW": 60,  # Seconds
+    "OPEN_DURATION": 5 * 60,  # Seconds a service with an open circuit stays down
+    "SHUTDOWN_TIMEOUT": 10,  # Seconds the services get to stop
+    "STATS_INTERVAL": 5 * 60,  # Seconds between the service stats log lines
+}
+
+# Retention job (see core/retention.py)
+# Policies run in order. Each one selects the screenshots older than "days",
+# optionally filtered by "types", "is_nsfw" and "is_profane", and applies
+# "action": "thumbnail" (shrink the image), "drop_image" or "delete".
+# Nothing is removed unless policies are configured, for example:
+#     {"action": "thumbnail", "days": 7, "is_nsfw": False},
+#     {"action": "drop_image", "days": 30, "is_nsfw": False},
+#     {"action": "delete", "days": 90, "types": ["META"]},
+RETENTION = {
+    "INTERVAL": 60 * 60,  # Seconds between runs
+    "BATCH_SIZE": 50,  # Rows per transaction - keeps the write lock short
+    "VACUUM_PAGES": 1024,  # Pages released per incremental_vacuum step
+    "THUMBNAIL_SIZE": 256,
+    "POLICIES": [],
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
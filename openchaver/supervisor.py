@@ -0,0 +1,239 @@
+import logging
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# The supervisors of this process - the API reports their services
+_supervisors = []
+
+
+class Service:
+    """A supervised thread and its restart history"""
+
+    def __init__(self, name: str, target, args=(), kwargs=None, daemon=True, stop=None) -> None:
+        self.name = name
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.daemon = daemon
+        self.stop = stop  # Optional callable asking the target to return
+
+        self.thread = None
+        self.state = "stopped"  # running, backoff, open (circuit breaker), stopped
+        self.started = 0.0
+        self.restart_at = None
+        self.restarts = 0
+        self.consecutive = 0  # Failures since the last stable run
+        self.failures = deque()  # Times of the recent failures
+        self.half_open = False  # Restarted after the circuit was open
+        self.last_exception = None
+        self.last_failure = None
+
+    def stats(self, now: float) -> dict:
+        stats = {
+            "state": self.state,
+            "alive": bool(self.thread and self.thread.is_alive()),
+            "uptime": round(now - self.started, 1) if self.state == "running" else 0.0,
+            "restarts": self.restarts,
+            "last_exception": self.last_exception,
+            "last_failure": self.last_failure,
+        }
+        if self.restart_at is not None:
+            stats["restart_in"] = round(max(self.restart_at - now, 0.0), 1)
+        return stats
+
+
+class Supervisor:
+    """Runs services in threads and restarts them when they die.
+
+    Every service thread reports its own death on a queue, so the
+    supervisor sleeps until a service dies or a restart is due - nothing
+    is polled. A service that dies is restarted after base_delay seconds,
+    doubled on every failure up to max_delay; a run of stable_after
+    seconds resets the delay. failure_threshold failures within
+    failure_window seconds open the circuit: the service is left down for
+    open_duration seconds, then tried once more - dying again before
+    stable_after opens the circuit again.
+
+    run() returns once stop() is called (SIGINT/SIGTERM when run from
+    the main thread): no more restarts, the services with a stop
+    callable are asked to return and get shutdown_timeout seconds in total
+    to finish.
+
+    services are the thread_runner dicts: name -> {"target", "args",
+    "kwargs", "daemon"} and optionally "stop".
+    """
+
+    def __init__(self, services: dict, **options) -> None:
+        config = {**settings.SUPERVISOR, **{k.upper(): v for k, v in options.items()}}
+        self.base_delay = config["BASE_DELAY"]
+        self.max_delay = config["MAX_DELAY"]
+        self.stable_after = config["STABLE_AFTER"]
+        self.failure_threshold = config["FAILURE_THRESHOLD"]
+        self.failure_window = config["FAILURE_WINDOW"]
+        self.open_duration = config["OPEN_DURATION"]
+        self.shutdown_timeout = config["SHUTDOWN_TIMEOUT"]
+        self.stats_interval = config["STATS_INTERVAL"]
+
+        self.services = {
+            name: Service(
+                name,
+                service["target"],
+                service.get("args", ()),
+                service.get("kwargs", {}),
+                service.get("daemon", True),
+                service.get("stop"),
+            )
+            for name, service in services.items()
+        }
+        self.events = queue.Queue()  # (service, thread, exception) of the dead threads
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start all the services"""
+        _supervisors.append(self)
+        for service in self.services.values():
+            self.launch(service)
+        logger.info(f"Supervising {len(self.services)} services")
+
+    def launch(self, service: Service) -> None:
+        with self.lock:
+            service.thread = threading.Thread(
+                target=self.run_service, args=(service,), name=service.name, daemon=service.daemon
+            )
+            service.thread.supervised = True  # restart_on_exception leaves the restarts to us
+            service.state = "running"
+            service.started = time.monotonic()
+            service.restart_at = None
+        service.thread.start()
+        logger.info(f"{service.name}: {service.thread.ident}")
+
+    def run_service(self, service: Service) -> None:
+        error = None
+        try:
+            service.target(*service.args, **service.kwargs)
+        except BaseException as e:  # Reported to the supervisor
+            error = e
+        self.events.put((service, threading.current_thread(), error))
+
+    def failed(self, service: Service, error: BaseException | None) -> None:
+        """Schedule the restart of a service that died"""
+        now = time.monotonic()
+        with self.lock:
+            if now - service.started >= self.stable_after:
+                # It ran fine for a while - a new failure streak
+                service.consecutive = 0
+                service.failures.clear()
+                service.half_open = False
+            service.consecutive += 1
+            service.failures.append(now)
+            while service.failures and now - service.failures[0] > self.failure_window:
+                service.failures.popleft()
+            service.last_exception = repr(error) if error else "returned"
+            service.last_failure = datetime.now(timezone.utc).isoformat()
+
+            if service.half_open or len(service.failures) >= self.failure_threshold:
+                service.state = "open"
+                service.half_open = True
+                delay = self.open_duration
+                logger.error(
+                    f'Service "{service.name}" failed {len(service.failures)} times - '
+                    f"circuit open for {delay}s. Last: {service.last_exception}"
+                )
+            else:
+                service.state = "backoff"
+                delay = min(self.base_delay * 2 ** (service.consecutive - 1), self.max_delay)
+                logger.error(
+                    f'Service "{service.name}" died ({service.last_exception}), '
+                    f"restarting in {delay}s"
+                )
+            service.restart_at = now + delay
+
+    def run(self, die_event: threading.Event | None = None) -> None:
+        """Start the services and supervise them until stop()"""
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: self.stop())
+        if die_event is not None:
+            threading.Thread(
+                target=lambda: (die_event.wait(), self.stop()), daemon=True
+            ).start()
+
+        self.start()
+        stats_timer = time.monotonic()
+        try:
+            while not self.stopping.is_set():
+                now = time.monotonic()
+                due = [s.restart_at for s in self.services.values() if s.restart_at is not None]
+                timeout = min([stats_timer + self.stats_interval, *due]) - now
+                try:
+                    event = self.events.get(timeout=max(timeout, 0))
+                except queue.Empty:
+                    event = None
+                if self.stopping.is_set():
+                    break
+                if event is not None:
+                    service, thread, error = event
+                    if thread is service.thread:
+                        self.failed(service, error)
+
+                now = time.monotonic()
+                for service in self.services.values():
+                    if service.restart_at is not None and service.restart_at <= now:
+                        service.restarts += 1
+                        self.launch(service)
+                if now - stats_timer >= self.stats_interval:
+                    stats_timer = now
+                    logger.info(f"Services: {self.stats()}")
+        finally:
+            self.shutdown()
+
+    def stop(self) -> None:
+        """Make run() return - safe from a signal handler"""
+        self.stopping.set()
+        self.events.put(None)  # Wake the supervisor up
+
+    def shutdown(self) -> None:
+        """Ask the services to return and wait for them"""
+        self.stopping.set()
+        logger.info("Stopping the services")
+        for service in self.services.values():
+            service.restart_at = None
+            if service.stop is not None:
+                try:
+                    service.stop()
+                except Exception:
+                    logger.exception(f'Unable to stop "{service.name}"')
+
+        # Daemon threads without a stop callable can not return, they end
+        # with the process
+        deadline = time.monotonic() + self.shutdown_timeout
+        for service in self.services.values():
+            if service.thread is not None and (service.stop or not service.daemon):
+                service.thread.join(max(deadline - time.monotonic(), 0))
+                if service.thread.is_alive():
+                    logger.warning(f'Service "{service.name}" did not stop in time')
+            service.state = "stopped"
+        if self in _supervisors:
+            _supervisors.remove(self)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self.lock:
+            return {name: service.stats(now) for name, service in self.services.items()}
+
+
+def service_stats() -> dict:
+    """Stats of the services supervised in this process"""
+    stats = {}
+    for supervisor in list(_supervisors):
+        stats.update(supervisor.stats())
+    return stats
@@ -15,40 +15,7 @@ def delete_old_logs(log_location:Path,keep:list[Path] = []):
             f.unlink()
 
 def thread_runner(threads, die_event=None):
-    # Create threads and start them
-    import threading as th
-    import time
+    """Run and supervise the threads - see openchaver.supervisor.Supervisor"""
+    from .supervisor import Supervisor
 
-    for k in threads.keys():
-        threads[k]["thread"] = th.Thread(
-            target=threads[k]["target"],
-            args=threads[k]["args"],
-            kwargs=threads[k]["kwargs"],
-            daemon=threads[k]["daemon"],
-        )
-
-    # Start threads
-    for k in threads.keys():
-        threads[k]["thread"].start()
-
-    # Print threads ids
-    for k in threads.keys():
-        logging.info(f"{k}: {threads[k]['thread'].ident}")
-
-    # Loop -> Restart threads if they die and sleep for 5 seconds
-    while True:
-        for k in threads.keys():
-            if not threads[k]["thread"].is_alive():
-                logging.error(f'Thread "{k}" is dead, restarting...')
-                threads[k]["thread"] = th.Thread(
-                    target=threads[k]["target"],
-                    args=threads[k]["args"],
-                    kwargs=threads[k]["kwargs"],
-                    daemon=threads[k]["daemon"],
-                )
-                threads[k]["thread"].start()
-
-        if die_event and die_event.is_set():
-            break
-
-        time.sleep(5)
\ No newline at end of file
+    Supervisor(threads).run(die_event)